@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Process-wide LRU of WhisperX alignment (wav2vec2) models keyed by (language, device).
+Weights are read from / downloaded into a local model directory, so after the first
+file of a language neither the download nor the model construction is repeated.
+Least recently used models are dropped once their parameters exceed the memory cap.
+"""
+
+import os, threading
+from collections import OrderedDict
+
+DEFAULT_MODEL_DIR = os.environ.get(
+    "CAPTIONIZE_ALIGN_DIR", os.path.join(os.path.expanduser("~"), ".cache", "captionize", "align"))
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+settings = {"model_dir": DEFAULT_MODEL_DIR, "max_bytes": DEFAULT_MAX_BYTES}
+_models = OrderedDict()  # (language, device) -> (model, metadata, nbytes)
+_lock = threading.Lock()
+
+
+def configure(model_dir=None, max_bytes=None):
+    if model_dir:
+        settings["model_dir"] = model_dir
+    if max_bytes is not None:
+        settings["max_bytes"] = max_bytes
+    with _lock:
+        _evict()
+
+
+def model_bytes(model):
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except Exception:
+        return 0
+
+
+def _evict():
+    total = sum(entry[2] for entry in _models.values())
+    while len(_models) > 1 and total > settings["max_bytes"]:
+        key, (_, _, nbytes) = _models.popitem(last=False)
+        total -= nbytes
+        print(f"[i] Evicted alignment model {key[0]}/{key[1]}")
+
+
+def get_align_model(language, device):
+    """Returns (align_model, metadata) like whisperx.load_align_model, loading at most once per key."""
+    key = (language, device)
+    with _lock:
+        if key in _models:
+            _models.move_to_end(key)
+            model, meta, _ = _models[key]
+            return model, meta
+
+        import whisperx
+        os.makedirs(settings["model_dir"], exist_ok=True)
+        model, meta = whisperx.load_align_model(language_code=language, device=device,
+                                                model_dir=settings["model_dir"])
+        _models[key] = (model, meta, model_bytes(model))
+        _evict()
+        return model, meta
+
+
+def preload(languages, device):
+    for language in languages:
+        print(f"[i] Preloading alignment model: {language} ({device})")
+        get_align_model(language, device)
+
+
+def clear():
+    with _lock:
+        _models.clear()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Warm ASR worker: loads the Whisper model once and serves transcription jobs over local HTTP.
+POST /transcribe takes either JSON {"audio": "/abs/path.wav"} or a raw body of
+16 kHz mono float32 samples (Content-Type: application/octet-stream).
+Run:    python asr_worker.py --port 8765
+Client: python bahmanPi.py --in video.mp4   (uses the worker if it is up, else loads in-process)
+"""
+
+import argparse, json, os, threading
+import urllib.request, urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import bahmanPi
+
+DEFAULT_WORKER = os.environ.get("CAPTIONIZE_WORKER", "http://127.0.0.1:8765")
+
+
+def make_handler(asr):
+    lock = threading.Lock()  # one model instance -> one job at a time
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._reply(404, {"error": "not found"})
+            self._reply(200, {"ok": True, "backend": asr["backend"], "device": asr["device"],
+                              "model": asr["model_name"], "compute_type": asr["compute_type"],
+                              "busy": lock.locked()})
+
+        def do_POST(self):
+            if self.path != "/transcribe":
+                return self._reply(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                if self.headers.get("Content-Type", "").startswith("application/octet-stream"):
+                    import numpy as np
+                    audio = np.frombuffer(body, dtype="<f4")
+                else:
+                    audio = json.loads(body.decode("utf-8"))["audio"]
+                    if not os.path.exists(audio):
+                        return self._reply(400, {"error": f"audio not found: {audio}"})
+                want = self.headers.get("X-Model")
+                if want and want != asr["model_name"]:
+                    return self._reply(409, {"error": f"worker runs {asr['model_name']}, job wants {want}"})
+                want = self.headers.get("X-Compute-Type")
+                if want and want != asr["compute_type"]:
+                    return self._reply(409, {"error": f"worker runs {asr['compute_type']}, job wants {want}"})
+                language = self.headers.get("X-Language") or None
+                with lock:
+                    words = bahmanPi.transcribe_word_timestamps(audio, asr=asr, language=language)
+                self._reply(200, {"words": words})
+            except Exception as e:
+                self._reply(500, {"error": str(e)})
+
+        def log_message(self, fmt, *args):
+            print(f"[worker] {self.address_string()} {fmt % args}")
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8765, prefer_whisperx=True, device_hint=None, model_name="medium", compute_type=None,
+          preload_align=(), batch_size=0):
+    asr = bahmanPi.load_asr(prefer_whisperx=prefer_whisperx, device_hint=device_hint,
+                            model_name=model_name, compute_type=compute_type, batch_size=batch_size)
+    if preload_align and asr["backend"] == "whisperx":
+        import align_cache
+        align_cache.preload(preload_align, asr["device"])
+    httpd = ThreadingHTTPServer((host, port), make_handler(asr))
+    print(f"[✓] ASR worker ready on http://{host}:{port} ({asr['backend']}, {asr['device']})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[!] Worker stopped.")
+    finally:
+        httpd.server_close()
+
+
+def worker_accepts(url=DEFAULT_WORKER, model_name=None, compute_type=None, timeout=1.0):
+    """True if a worker answers /health and runs the requested model/compute type."""
+    try:
+        with urllib.request.urlopen(url.rstrip("/") + "/health", timeout=timeout) as resp:
+            info = json.loads(resp.read().decode("utf-8"))
+    except (urllib.error.URLError, ConnectionError, OSError, ValueError):
+        return False
+    return ((not model_name or info.get("model") == model_name)
+            and (not compute_type or info.get("compute_type") == compute_type))
+
+
+def remote_transcribe(audio, url=DEFAULT_WORKER, timeout=3600, model_name=None, compute_type=None, language=None):
+    """
+    Hand a transcription job (WAV path or float32 NumPy array) to a running worker.
+    Returns the word list, or None if no worker is reachable or it runs a different
+    model/compute type (caller falls back to in-process).
+    """
+    if isinstance(audio, str):
+        payload = json.dumps({"audio": os.path.abspath(audio)}).encode("utf-8")
+        ctype = "application/json"
+    else:
+        payload = audio.astype("<f4", copy=False).tobytes()
+        ctype = "application/octet-stream"
+    headers = {"Content-Type": ctype}
+    if model_name:
+        headers["X-Model"] = model_name
+    if compute_type:
+        headers["X-Compute-Type"] = compute_type
+    if language:
+        headers["X-Language"] = language
+    req = urllib.request.Request(url.rstrip("/") + "/transcribe", data=payload, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))["words"]
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", "replace")
+        if e.code == 409:
+            print(f"[i] Worker not used: {detail}")
+            return None
+        raise SystemExit(f"Worker failed ({e.code}): {detail}")
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Warm ASR worker for bahmanPi.py")
+    ap.add_argument("--host", dest="host", default="127.0.0.1", help="Bind address")
+    ap.add_argument("--port", dest="port", type=int, default=8765, help="Bind port")
+    ap.add_argument("--cpu", dest="cpu", action="store_true", help="Force CPU")
+    ap.add_argument("--model", dest="model", default="medium", help="Whisper model size")
+    ap.add_argument("--compute-type", dest="compute_type", default=None, help="CTranslate2 compute type")
+    ap.add_argument("--preload-align", dest="preload_align", default="fa",
+                    help="Comma-separated languages whose alignment models are loaded at startup ('' for none)")
+    ap.add_argument("--align-model-dir", dest="align_model_dir", default=None, help="Local WhisperX alignment model dir")
+    ap.add_argument("--align-cache-mb", dest="align_cache_mb", type=int, default=2048, help="Memory cap for cached alignment models")
+    ap.add_argument("--batch-size", dest="batch_size", type=int, default=0,
+                    help="Batched inference over VAD chunks (0 = sequential)")
+    ap.add_argument("--no-whisperx", dest="no_whisperx", action="store_true", help="Use faster-whisper even if WhisperX is installed")
+    args = ap.parse_args()
+
+    import align_cache
+    align_cache.configure(model_dir=args.align_model_dir, max_bytes=args.align_cache_mb * 1024 * 1024)
+    serve(args.host, args.port, prefer_whisperx=not args.no_whisperx,
+          device_hint="cpu" if args.cpu else None, model_name=args.model, compute_type=args.compute_type,
+          preload_align=[l.strip() for l in args.preload_align.split(",") if l.strip()],
+          batch_size=args.batch_size)
+
+if __name__ == "__main__":
+    main()
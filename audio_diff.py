@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Audio fingerprints and timeline alignment for re-edited media (bahmanPi.py --previous).
+Every 20 ms of 16 kHz audio gets a 32-bit code: the signs of the energy differences between
+33 log-spaced bands (300-2000 Hz), taken across frequency and time. The codes survive
+re-encoding, so one-second blocks of the new audio are located in the old audio by exact
+code lookups and confirmed by their bit error rate, then refined to single frames at the cuts.
+Matched regions reuse the old words with shifted times; only the rest needs ASR.
+"""
+
+import bisect
+from itertools import accumulate
+
+import numpy as np
+
+SR = 16000
+FRAME = 4096        # 256 ms analysis window: long enough that a half-hop misalignment keeps codes close
+HOP = 320           # 20 ms between codes
+BANDS = 33          # 32 difference bits per code
+LOW_HZ, HIGH_HZ = 300.0, 2000.0
+SILENCE_DB = -50.0  # frame RMS below this carries no speech
+MAX_BER = 0.35      # frames further apart than this (bit error rate) don't match
+BLOCK = 50          # frames per lookup block (1 s)
+MAX_HITS = 32       # codes more common than this in the old audio say nothing about position
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(x):
+    x = np.ascontiguousarray(x, dtype=np.uint32)
+    return _POPCOUNT[x.view(np.uint8)].reshape(len(x), 4).sum(axis=1)
+
+
+def _band_matrix():
+    freqs = np.fft.rfftfreq(FRAME, 1.0 / SR)
+    edges = np.geomspace(LOW_HZ, HIGH_HZ, BANDS + 1)
+    m = np.zeros((len(freqs), BANDS), dtype=np.float32)
+    for b in range(BANDS):
+        m[(freqs >= edges[b]) & (freqs < edges[b + 1]), b] = 1.0
+    return m
+
+
+def fingerprint(audio, batch=1024):
+    """
+    {"codes": uint32[n], "silent": bool[n], "seconds": duration} for mono float32 16 kHz audio.
+    Code i describes samples [i*HOP, i*HOP + FRAME).
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    seconds = len(audio) / SR
+    if len(audio) < FRAME:
+        audio = np.pad(audio, (0, FRAME - len(audio)))
+    frames = np.lib.stride_tricks.sliding_window_view(audio, FRAME)[::HOP]
+    window = np.hanning(FRAME).astype(np.float32)
+    bands = _band_matrix()
+    energy = np.empty((len(frames), BANDS), dtype=np.float32)
+    power = np.empty(len(frames), dtype=np.float32)
+    for i in range(0, len(frames), batch):
+        chunk = frames[i:i + batch]
+        power[i:i + batch] = np.mean(chunk * chunk, axis=1)
+        energy[i:i + batch] = (np.abs(np.fft.rfft(chunk * window, axis=1)) ** 2) @ bands
+    d = energy[:, :-1] - energy[:, 1:]
+    bits = np.zeros(d.shape, dtype=np.uint32)
+    bits[1:] = (d[1:] - d[:-1]) > 0
+    codes = (bits << np.arange(BANDS - 1, dtype=np.uint32)).sum(axis=1, dtype=np.uint64).astype(np.uint32)
+    silent = 10 * np.log10(power + 1e-12) < SILENCE_DB
+    return {"codes": codes, "silent": silent, "seconds": seconds}
+
+
+def _runs(keys):
+    """[(start, end, key)] for each run of equal values in `keys`."""
+    if not len(keys):
+        return []
+    cuts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.r_[0, cuts]
+    ends = np.r_[cuts, len(keys)]
+    return [(int(a), int(b), int(keys[a])) for a, b in zip(starts, ends)]
+
+
+def _smooth(err, loud, width=5):
+    # mean error of the loud frames around each frame; frames with no loud neighbour pass
+    k, h = np.ones(width), width // 2
+    s = np.convolve(np.where(loud, err, 0.0), k)[h:h + len(err)]
+    c = np.convolve(loud.astype(np.float64), k)[h:h + len(err)]
+    return np.where(c > 0, s / np.maximum(c, 1), 0.0)
+
+
+def align(old, new, max_ber=MAX_BER, min_match=0.5):
+    """
+    Map the new timeline onto the old one, given two fingerprint() results. Returns (matches, changed):
+    matches = [{"start", "end", "shift"}] in new-timeline seconds (old time = new time + shift),
+    changed = [(start, end)] spans of non-silent new audio that were found nowhere in the old audio.
+    """
+    oc, nc = old["codes"], new["codes"]
+    n_old, n_new = len(oc), len(nc)
+    loud = ~new["silent"]
+    off = np.zeros(n_new, dtype=np.int64)
+    matched = np.zeros(n_new, dtype=bool)
+
+    old_loud = np.flatnonzero(~old["silent"])
+    order = old_loud[np.argsort(oc[old_loud], kind="stable")]
+    sorted_codes = oc[order]
+
+    def frame_err(o, a, b):
+        j = np.arange(a, b)
+        i = j + o
+        ok = (i >= 0) & (i < n_old)
+        err = np.full(b - a, 0.5)
+        err[ok] = _popcount(nc[j[ok]] ^ oc[i[ok]]) / 32.0
+        return _smooth(err, loud[a:b])
+
+    # 1) one-second blocks: vote on offsets from exact code hits, confirm by bit error rate
+    prev = None
+    for a in range(0, n_new, BLOCK):
+        b = min(a + BLOCK, n_new)
+        lj = np.flatnonzero(loud[a:b]) + a
+        if len(lj) < (b - a) // 4:
+            continue  # (mostly) silence: nothing to match, nothing to transcribe
+        votes = {}
+        lo = np.searchsorted(sorted_codes, nc[lj], "left")
+        hi = np.searchsorted(sorted_codes, nc[lj], "right")
+        for j, l, h in zip(lj, lo, hi):
+            if 0 < h - l <= MAX_HITS:
+                for i in order[l:h]:
+                    votes[i - j] = votes.get(i - j, 0) + 1
+        cands = sorted(votes, key=votes.get, reverse=True)[:3]
+        if prev is not None:
+            # continuity: the block after a match usually has the same offset, or one frame off
+            # when the real shift falls between two frames (exact hits are rare there)
+            cands += [o for o in (prev, prev - 1, prev + 1) if o not in cands]
+        best, best_err = None, max_ber
+        for o in cands:
+            i = lj + o
+            ok = (i >= 0) & (i < n_old)
+            if not ok.any() or ok.sum() < len(lj) // 2:
+                continue
+            e = _popcount(nc[lj[ok]] ^ oc[i[ok]]).mean() / 32.0
+            if e < best_err:
+                best, best_err = int(o), e
+        if best is None:
+            continue
+        prev = best
+        good = frame_err(best, a, b) < max_ber  # a cut inside the block only matches on one side
+        off[a:b][good] = best
+        matched[a:b][good] = True
+
+    # 2) grow each matched run frame by frame into unmatched neighbours, up to the next match
+    #    or the first frame that doesn't fit (cuts rarely sit on block edges)
+    for a, b, o in _runs(np.where(matched, off, np.iinfo(np.int64).min)):
+        if not matched[a]:
+            continue
+        for step in (1, -1):
+            edge = b if step == 1 else a - 1
+            lim = n_new if step == 1 else -1
+            js = np.arange(edge, lim, step)
+            stop = np.flatnonzero(matched[js]) if len(js) else []
+            js = js[:stop[0]] if len(stop) else js
+            if not len(js):
+                continue
+            lo_j, hi_j = js.min(), js.max() + 1
+            err = frame_err(o, lo_j, hi_j)
+            err = err if step == 1 else err[::-1]
+            bad = np.flatnonzero(err >= max_ber)
+            js = js[:bad[0]] if len(bad) else js
+            off[js] = o
+            matched[js] = True
+
+    # 3) regions: consecutive runs whose offsets stay within one frame of each other form one
+    #    region (a cut that isn't a multiple of HOP leaves frames flipping between o and o + 1),
+    #    bridged across silent or sub-second gaps (noise around pauses; an edit there would have
+    #    moved the offset by more than a frame). Regions too short to trust are dropped.
+    regions = []  # [first frame, end frame, min offset, max offset]
+    for a, b, o in _runs(np.where(matched, off, np.iinfo(np.int64).min)):
+        if not matched[a]:
+            continue
+        if regions:
+            r = regions[-1]
+            if (a - r[1] < BLOCK or not loud[r[1]:a].any()) and max(r[3], o) - min(r[2], o) <= 1:
+                r[1], r[2], r[3] = b, min(r[2], o), max(r[3], o)
+                continue
+        regions.append([a, b, o, o])
+    regions = [r for r in regions if (r[1] - r[0]) * HOP / SR >= min_match]
+
+    def t(j):
+        # frame j is centred at j*HOP + FRAME/2; runs end half a hop past their last centre
+        return float(min(max(0.0, (j * HOP + FRAME / 2 - HOP / 2) / SR), new["seconds"]))
+
+    def add_changed(a, b):
+        lj = np.flatnonzero(loud[a:b]) + a
+        if len(lj):
+            changed.append((max(0.0 if a == 0 else t(a), t(lj[0])), min(t(b), t(lj[-1] + 1))))
+
+    matches, changed, prev_end = [], [], 0
+    for a, b, lo, hi in regions:
+        add_changed(prev_end, a)
+        # sub-frame shift: the mean offset of the region's matched frames
+        shift = float(off[a:b][matched[a:b]].mean()) * HOP / SR if hi > lo else lo * HOP / SR
+        matches.append({"start": 0.0 if a == 0 else t(a), "end": new["seconds"] if b == n_new else t(b),
+                        "shift": shift})
+        prev_end = b
+    add_changed(prev_end, n_new)
+    return matches, changed
+
+
+def remap_words(words, matches, tol=0.02):
+    """
+    Old words lying wholly inside a matched region, copied onto the new timeline. Returns
+    (kept, partial): partial are the (start, end) new-timeline pieces of old words cut by an
+    edit, which have to be transcribed again.
+    """
+    kept, partial = [], []
+    for w in words:
+        for m in matches:
+            a, b = m["start"] + m["shift"], m["end"] + m["shift"]
+            if w["end"] <= a or w["start"] >= b:
+                continue
+            if w["start"] >= a - tol and w["end"] <= b + tol:
+                kept.append(dict(w, start=max(m["start"], w["start"] - m["shift"]),
+                                 end=min(m["end"], w["end"] - m["shift"])))
+            else:
+                partial.append((max(a, w["start"]) - m["shift"], min(b, w["end"]) - m["shift"]))
+    kept.sort(key=lambda w: w["start"])
+    return kept, partial
+
+
+def retranscribe_windows(spans, kept, seconds, join=0.3):
+    """
+    Windows of the new audio to run ASR on: each span widened to the neighbouring kept words
+    (so words cut at an edit are heard whole), merged when they touch.
+    """
+    starts = [w["start"] for w in kept]
+    ends_max = list(accumulate((w["end"] for w in kept), max))
+    windows = []
+    for a, b in sorted(spans):
+        i = bisect.bisect_left(starts, a)
+        lo = min(a, ends_max[i - 1]) if i else 0.0
+        j = bisect.bisect_right(starts, b)
+        hi = max(b, starts[j]) if j < len(starts) else seconds
+        if windows and lo <= windows[-1][1] + join:
+            windows[-1][1] = max(windows[-1][1], hi)
+        else:
+            windows.append([lo, hi])
+    return [(a, b) for a, b in windows if b > a]
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import argparse, os, subprocess, shutil, sys, math
+import argparse, os, re, subprocess, shutil, sys, math, tempfile, importlib.util, functools, glob, json, queue, threading, time
+from contextlib import contextmanager, nullcontext, ExitStack
 import os
 os.environ.pop('http_proxy', None)
 os.environ.pop('https_proxy', None)
@@ -16,8 +17,72 @@ def run(cmd):
         raise SystemExit(f"Command failed: {' '.join(cmd)}")
     return p.stdout
 
-def extract_wav(src, wav_path, sr=16000):
-    run(["ffmpeg", "-y", "-i", src, "-ac", "1", "-ar", str(sr), "-vn", wav_path])
+PROFILER = None  # stage_profile.StageProfiler while --profile is active
+
+def _stage(name):
+    return PROFILER.stage(name) if PROFILER else nullcontext()
+
+def _profiled(name, iterable):
+    return PROFILER.wrap_iter(name, iterable) if PROFILER else iterable
+
+@contextmanager
+def _stage_beside(name, loader):
+    """_stage(name) while `loader` (a BackgroundLoad) runs: its thread's CPU goes to model_load, not `name`."""
+    before = loader.cpu_time() if PROFILER and loader else None
+    with _stage(name):
+        yield
+    after = loader.cpu_time() if before is not None else None
+    if after is not None:
+        PROFILER.move_cpu(name, "model_load", after - before)
+
+def extract_wav(src, wav_path, sr=16000, start=None, duration=None):
+    seek = ["-ss", f"{start:.3f}"] if start else []
+    seek += ["-t", f"{duration:.3f}"] if duration else []
+    run(["ffmpeg", "-y"] + seek + ["-i", src, "-ac", "1", "-ar", str(sr), "-vn", wav_path])
+
+def decode_audio(src, sr=16000, start=None, duration=None):
+    """
+    Decode to 16 kHz mono float32 in memory: ffmpeg writes s16le PCM to stdout, nothing touches disk.
+    `start`/`duration` (seconds) decode only that window.
+    """
+    import numpy as np
+    cmd = ["ffmpeg", "-nostdin", "-v", "error"]
+    if start:
+        cmd += ["-ss", f"{start:.3f}"]
+    if duration:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-i", src, "-ac", "1", "-ar", str(sr), "-vn", "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1"]
+    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if p.returncode != 0:
+        print(p.stderr.decode("utf-8", "replace"))
+        raise SystemExit(f"Command failed: {' '.join(cmd)}")
+    return np.frombuffer(p.stdout, np.int16).astype(np.float32) / 32768.0
+
+@contextmanager
+def audio_source(src, sr=16000, use_tempfile=False, start=None, duration=None):
+    """
+    Yields what the transcriber should read: a NumPy array (default), or the path of a
+    temporary WAV that is removed on exit (use_tempfile=True, or when NumPy is unavailable).
+    `start` seeks into the input first and `duration` limits the window (seconds).
+    """
+    if not use_tempfile:
+        try:
+            import numpy  # noqa
+        except ImportError:
+            use_tempfile = True
+    if not use_tempfile:
+        yield decode_audio(src, sr=sr, start=start, duration=duration)
+        return
+    fd, wav_path = tempfile.mkstemp(prefix="captionize_", suffix=".wav")
+    os.close(fd)
+    try:
+        extract_wav(src, wav_path, sr=sr, start=start, duration=duration)
+        yield wav_path
+    finally:
+        try:
+            os.remove(wav_path)
+        except OSError:
+            pass
 
 def has_whisperx():
     try: 
@@ -26,49 +91,304 @@ def has_whisperx():
     except Exception:
         return False
 
-def transcribe_word_timestamps(wav_path, prefer_whisperx=True, device_hint=None):
+def pick_device(device_hint=None):
+    if device_hint:
+        return device_hint
+    try:
+        import ctranslate2  # already a faster-whisper dependency and much lighter than torch
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except Exception:
+        pass
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except Exception:
+        return "cpu"
+
+def default_compute_type(device):
+    return "float16" if device == "cuda" else "int8"
+
+def load_asr(prefer_whisperx=True, device_hint=None, model_name="medium", compute_type=None,
+             cpu_threads=0, num_workers=1, batch_size=0):
     """
-    Returns list of dicts: [{"text": "...", "start": float, "end": float}, ...]
+    Loads the ASR model once. Returns a handle dict for transcribe_word_timestamps:
+    {"backend": "whisperx" | "faster-whisper", "device": str, "model_name": str, "compute_type": str,
+     "model": obj, "batch_size": int, "batched": BatchedInferencePipeline | None}
+    compute_type=None picks float16 on CUDA and int8 otherwise; cpu_threads=0 lets the backend decide;
+    num_workers > 1 lets faster-whisper serve that many concurrent transcribe() calls from different threads.
+    batch_size > 0 decodes that many VAD speech chunks per model call (faster-whisper's
+    BatchedInferencePipeline; WhisperX's own batch size).
     """
-    words = []
-    device = device_hint
-    if not device:
-        try:
-            import torch
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-        except Exception:
-            device = "cpu"
-
+    device = pick_device(device_hint)
+    compute_type = compute_type or default_compute_type(device)
     if prefer_whisperx and has_whisperx():
         import whisperx
-        print("[i] Using WhisperX")
-        asr_model = whisperx.load_model("medium", device)
-        result = asr_model.transcribe(wav_path)
+        print(f"[i] Using WhisperX ({model_name}, {compute_type})")
+        opts = {"threads": cpu_threads} if cpu_threads else {}
+        model = whisperx.load_model(model_name, device, compute_type=compute_type, **opts)
+        return {"backend": "whisperx", "device": device, "model_name": model_name,
+                "compute_type": compute_type, "model": model, "batch_size": batch_size, "batched": None}
 
-        align_model, meta = whisperx.load_align_model(language_code=result["language"], device=device)
-        aligned = whisperx.align(result["segments"], align_model, meta, wav_path, device)
-        for seg in aligned["segments"]:
-            for w in seg.get("words", []):
-                t = (w.get("word") or "").strip()
-                if t and (w.get("start") is not None) and (w.get("end") is not None):
-                    words.append({"text": t, "start": float(w["start"]), "end": float(w["end"])})
+    print(f"[i] Using faster-whisper ({model_name}, {compute_type})")
+    from faster_whisper import WhisperModel
+    model = WhisperModel(model_name, device=device, compute_type=compute_type,
+                         cpu_threads=cpu_threads, num_workers=num_workers)
+    batched = None
+    if batch_size > 0:
+        from faster_whisper import BatchedInferencePipeline
+        print(f"[i] Batched inference: {batch_size} VAD chunks per call")
+        batched = BatchedInferencePipeline(model=model)
+    return {"backend": "faster-whisper", "device": device, "model_name": model_name,
+            "compute_type": compute_type, "model": model, "batch_size": batch_size, "batched": batched}
+
+class BackgroundLoad:
+    """
+    load_asr() in a daemon thread, so model weights load while ffmpeg decodes the audio.
+    get() blocks until the model is ready (re-raising a load failure).
+    """
+    def __init__(self, **load_kwargs):
+        self.asr, self.error, self.seconds, self.cpu_seconds = None, None, None, None
+        self._thread = threading.Thread(target=self._run, args=(load_kwargs,), daemon=True)
+        self._thread.start()
+
+    def _run(self, load_kwargs):
+        t0 = time.perf_counter()
+        try:
+            self.asr = load_asr(**load_kwargs)
+        except BaseException as e:
+            self.error = e
+        self.seconds = time.perf_counter() - t0
+        self.cpu_seconds = time.thread_time()
+
+    def cpu_time(self):
+        """CPU seconds the loader thread has used so far, None where another thread's clock can't be read."""
+        if self.cpu_seconds is not None:
+            return self.cpu_seconds
+        try:
+            return time.clock_gettime(time.pthread_getcpuclockid(self._thread.ident))
+        except (AttributeError, OSError):  # no per-thread clocks here, or the thread just exited
+            return self.cpu_seconds
+
+    def get(self):
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.asr
+
+def detect_language(audio, device_hint=None, seconds=30.0, sr=16000):
+    """
+    Cheap language-detection pre-pass: the tiny model on the first `seconds` of `audio`
+    (a float32 array, or a media path that is decoded for just that window).
+    """
+    from faster_whisper import WhisperModel
+    if isinstance(audio, str):
+        sample = decode_audio(audio, sr=sr, duration=seconds)
     else:
-        print("[i] Using faster-whisper")
-        from faster_whisper import WhisperModel
-        compute_type = "float16" if device == "cuda" else "int8"
-        model = WhisperModel("medium", device=device, compute_type=compute_type)
-        segments, info = model.transcribe(wav_path, word_timestamps=True, vad_filter=True)
-        for seg in segments:
-            for w in seg.words:
-                t = w.word.strip()
-                if t:
-                    words.append({"text": t, "start": float(w.start), "end": float(w.end)})
+        sample = audio[:int(seconds * sr)]
+    device = pick_device(device_hint)
+    model = WhisperModel("tiny", device=device, compute_type=default_compute_type(device))
+    _, info = model.transcribe(sample, beam_size=1)  # detection runs eagerly; segments are never consumed
+    print(f"[i] Detected language: {info.language} (p={info.language_probability:.2f})")
+    return info.language
+
+def iter_segment_words(wav_path, asr, language=None):
+    """
+    Yields (segment_end, [{"text", "start", "end", "prob"}, ...]) per finished ASR segment. faster-whisper's
+    segment generator is consumed lazily, so segments arrive while the rest is still being transcribed.
+    A `language` code skips the model's own language detection. "prob" is the word confidence
+    (faster-whisper probability / WhisperX alignment score), omitted when the backend has none.
+    """
+    if asr["backend"] == "whisperx":
+        segments = _whisperx_segments(wav_path, asr, language=language)
+    elif asr.get("batched") is not None:
+        # VAD-split speech chunks go through the model batch_size at a time; still word-timestamped
+        fw_segments, info = asr["batched"].transcribe(wav_path, language=language, word_timestamps=True,
+                                                      vad_filter=True, batch_size=asr["batch_size"])
+        segments = ((seg.end, [(w.word, w.start, w.end, w.probability) for w in seg.words or ()])
+                    for seg in fw_segments)
+    else:
+        fw_segments, info = asr["model"].transcribe(wav_path, language=language, word_timestamps=True, vad_filter=True)
+        segments = ((seg.end, [(w.word, w.start, w.end, w.probability) for w in seg.words]) for seg in fw_segments)
+
+    for seg_end, seg_words in segments:
+        words = []
+        for text, start, end, prob in seg_words:
+            t = text.strip()
+            if t and start is not None and end is not None and any(ch.isalnum() for ch in t):
+                w = {"text": t, "start": float(start), "end": float(end)}
+                if prob is not None:
+                    w["prob"] = round(float(prob), 3)
+                words.append(w)
+        if seg_end is None:
+            seg_end = words[-1]["end"] if words else 0.0
+        yield float(seg_end), words
+
+WHISPERX_WINDOW_SECONDS = 300.0  # WhisperX transcribes and aligns all it is given before returning anything
+
+def _whisperx_segments(audio, asr, language=None, sr=16000):
+    """
+    WhisperX transcribe + align over silence-cut windows of about WHISPERX_WINDOW_SECONDS, so segments
+    (and their checkpoints) arrive window by window instead of once the whole input is done.
+    The first window's detected language is kept for the rest. Yields
+    (segment_end, [(word, start, end, score), ...]) in input time.
+    """
+    import whisperx
+    import align_cache
+    if isinstance(audio, str):
+        audio = whisperx.load_audio(audio, sr=sr)
+    opts = {"batch_size": asr["batch_size"]} if asr.get("batch_size") else {}
+    cuts = [0] + find_silence_cuts(audio, sr=sr, target_len=WHISPERX_WINDOW_SECONDS) + [len(audio)]
+    for a, b in zip(cuts[:-1], cuts[1:]):
+        clip, offset = audio[a:b], a / sr
+        result = asr["model"].transcribe(clip, language=language, **opts)
+        language = language or result["language"]
+        if not result["segments"]:
+            continue
+        with _stage("align_model_load"):
+            align_model, meta = align_cache.get_align_model(language, asr["device"])
+        with _stage("align"):
+            aligned = whisperx.align(result["segments"], align_model, meta, clip, asr["device"])
+        shift = lambda t: None if t is None else t + offset
+        for seg in aligned["segments"]:
+            yield shift(seg.get("end")), [(w.get("word") or "", shift(w.get("start")), shift(w.get("end")),
+                                           w.get("score")) for w in seg.get("words", [])]
+
+def iter_word_timestamps(wav_path, asr, language=None):
+    """Yields {"text", "start", "end"} dicts as the backend produces them (see iter_segment_words)."""
+    for _, words in iter_segment_words(wav_path, asr, language=language):
+        yield from words
 
-    cleaned = []
+def transcribe_word_timestamps(wav_path, prefer_whisperx=True, device_hint=None, asr=None,
+                               model_name="medium", compute_type=None, language=None):
+    """
+    Returns list of dicts: [{"text": "...", "start": float, "end": float}, ...]
+    `wav_path` may be a file path or a 16 kHz mono float32 NumPy array (see decode_audio).
+    Pass a handle from load_asr() as `asr` to reuse an already loaded model.
+    """
+    if asr is None:
+        asr = load_asr(prefer_whisperx=prefer_whisperx, device_hint=device_hint,
+                       model_name=model_name, compute_type=compute_type)
+    return list(iter_word_timestamps(wav_path, asr, language=language))
+
+class SharedASR:
+    """
+    One model shared by batch worker threads, loaded on first use (an all-cache-hit batch never loads it).
+    faster-whisper runs concurrent calls itself (num_workers); WhisperX calls are serialized.
+    """
+    def __init__(self, prefer_whisperx=True, device_hint=None, model_name="medium", compute_type=None, workers=1,
+                 batch_size=0):
+        self.prefer_whisperx = prefer_whisperx
+        self.batch_size = batch_size
+        self.device_hint = device_hint
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.workers = workers
+        self.asr = None
+        self._load_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    def iter_segments(self, audio, language=None):
+        with self._load_lock:
+            if self.asr is None:
+                self.asr = load_asr(prefer_whisperx=self.prefer_whisperx, device_hint=self.device_hint,
+                                    model_name=self.model_name, compute_type=self.compute_type,
+                                    num_workers=self.workers, batch_size=self.batch_size)
+        if self.asr["backend"] == "faster-whisper":
+            yield from iter_segment_words(audio, self.asr, language=language)
+            return
+        with self._run_lock:
+            segments = list(iter_segment_words(audio, self.asr, language=language))
+        yield from segments
+
+    def iter_words(self, audio, language=None):
+        for _, words in self.iter_segments(audio, language=language):
+            yield from words
+
+    def transcribe(self, audio, language=None):
+        return list(self.iter_words(audio, language=language))
+
+def find_silence_cuts(audio, sr=16000, target_len=300.0, search=30.0, frame=0.02):
+    """
+    Sample indices to split `audio` at, roughly every `target_len` seconds:
+    each cut lands on the quietest ~0.2 s stretch within +/- `search` seconds of the target.
+    """
+    import numpy as np
+    hop = int(sr * frame)
+    n = len(audio) // hop
+    if n == 0:
+        return []
+    energy = np.sqrt(np.mean(np.square(audio[:n * hop].reshape(n, hop)), axis=1))
+    smooth = np.convolve(energy, np.ones(10) / 10, mode="same")
+
+    cuts = []
+    pos = 0
+    step, win = int(target_len / frame), int(search / frame)
+    while pos + step + win < n:
+        lo, hi = pos + step - win, pos + step + win
+        i = lo + int(np.argmin(smooth[lo:hi]))
+        cuts.append(i * hop)
+        pos = i
+    return cuts
+
+_CHUNK_ASR = None
+
+def _init_chunk_worker(prefer_whisperx, device_hint, model_name, compute_type, cpu_threads, batch_size=0):
+    global _CHUNK_ASR
+    _CHUNK_ASR = load_asr(prefer_whisperx=prefer_whisperx, device_hint=device_hint, model_name=model_name,
+                          compute_type=compute_type, cpu_threads=cpu_threads, batch_size=batch_size)
+
+def _transcribe_chunk(offset, end, chunk, language=None):
+    words = transcribe_word_timestamps(chunk, asr=_CHUNK_ASR, language=language)
     for w in words:
-        if any(ch.isalnum() for ch in w["text"]):
-            cleaned.append(w)
-    return cleaned
+        w["start"] = min(max(w["start"] + offset, offset), end)
+        w["end"] = min(max(w["end"] + offset, w["start"]), end)
+    return words
+
+def merge_chunk_words(chunk_words):
+    """
+    Merge per-chunk word lists (already shifted to absolute time) into one ordered list.
+    A word repeated across a chunk edge (same text, overlapping the previous word) is kept once.
+    """
+    merged = []
+    for words in chunk_words:
+        for w in sorted(words, key=lambda w: w["start"]):
+            if merged:
+                last = merged[-1]
+                if w["text"] == last["text"] and w["start"] < last["end"]:
+                    continue
+            merged.append(w)
+    return merged
+
+def transcribe_parallel(audio, jobs, sr=16000, prefer_whisperx=True, device_hint=None,
+                        model_name="medium", compute_type=None, chunk_len=300.0, language=None, batch_size=0):
+    """
+    Split `audio` on silence and transcribe the chunks in `jobs` processes, each with its own
+    model and cpu_count // jobs CPU threads. Returns the same word list as transcribe_word_timestamps.
+    Without `language` every chunk detects its own; pin or pre-detect it for consistent results.
+    `batch_size` is passed to every process's load_asr (batched inference inside each chunk).
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if isinstance(audio, str):
+        audio = decode_audio(audio, sr=sr)
+    bounds = [0] + find_silence_cuts(audio, sr=sr, target_len=chunk_len) + [len(audio)]
+    chunks = [(a / sr, b / sr, audio[a:b]) for a, b in zip(bounds, bounds[1:]) if b > a]
+    if len(chunks) < 2 or jobs < 2:
+        asr = load_asr(prefer_whisperx=prefer_whisperx, device_hint=device_hint, model_name=model_name,
+                       compute_type=compute_type, batch_size=batch_size)
+        return transcribe_word_timestamps(audio, asr=asr, language=language)
+
+    jobs = min(jobs, len(chunks))
+    cpu_threads = max(1, (os.cpu_count() or 1) // jobs)
+    print(f"[i] Transcribing {len(chunks)} chunks in {jobs} processes ({cpu_threads} threads each)…")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_chunk_worker,
+                             initargs=(prefer_whisperx, device_hint, model_name, compute_type, cpu_threads,
+                                       batch_size)) as pool:
+        futures = [pool.submit(_transcribe_chunk, off, end, chunk, language) for off, end, chunk in chunks]
+        chunk_words = [f.result() for f in futures]
+    return merge_chunk_words(chunk_words)
 
 def ass_header(font="Vazirmatn", fontsize=64, playres=(1080, 1920), alignment=500):
     w, h = playres
@@ -88,137 +408,1038 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 """
 
 def fmt_ass_ts(t):
-    h = int(t // 3600)
-    m = int((t % 3600) // 60)
-    s = int(t % 60)
-    cs = int((t - int(t)) * 100)
-    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+    ti = int(t)
+    cs = int((t - ti) * 100)
+    if t < 0:
+        h = int(t // 3600)
+        m = int((t % 3600) // 60)
+        s = int(t % 60)
+        return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+    return "%d:%02d:%02d.%02d" % (ti // 3600, ti % 3600 // 60, ti % 60, cs)
 
-def chunk_words_into_readable_lines(words, max_gap=0.60, max_words=8):
-    lines = []
-    if not words:
-        return lines
-    line = {"start": words[0]["start"], "end": words[0]["end"], "words": [words[0]]}
-    for i in range(1, len(words)):
-        prev = words[i - 1]
-        cur = words[i]
-        gap = cur["start"] - prev["end"]
-        if gap > max_gap or len(line["words"]) >= max_words:
-            line["end"] = line["words"][-1]["end"]
-            lines.append(line)
+def parse_ass_ts(ts):
+    h, m, s = ts.strip().split(":")
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+def parse_time(value):
+    """Seconds from "90", "1:30" or "0:01:30.5"."""
+    secs = 0.0
+    for part in str(value).split(":"):
+        secs = secs * 60 + float(part)
+    return secs
+
+def iter_readable_lines(words, max_gap=0.60, max_words=8):
+    """
+    Streaming form of chunk_words_into_readable_lines: consumes any iterable of words and
+    yields each line as soon as the next word (or the end of input) proves it is final.
+    A word_store.WordTable is split with its vectorized line_breaks() instead.
+    """
+    if hasattr(words, "iter_lines"):
+        yield from words.iter_lines(max_gap=max_gap, max_words=max_words)
+        return
+    line = None
+    prev = None
+    for cur in words:
+        if line is None:
             line = {"start": cur["start"], "end": cur["end"], "words": [cur]}
         else:
-            line["words"].append(cur)
-    line["end"] = line["words"][-1]["end"]
-    lines.append(line)
-    return lines
+            gap = cur["start"] - prev["end"]
+            if gap > max_gap or len(line["words"]) >= max_words:
+                line["end"] = line["words"][-1]["end"]
+                yield line
+                line = {"start": cur["start"], "end": cur["end"], "words": [cur]}
+            else:
+                line["words"].append(cur)
+        prev = cur
+    if line is not None:
+        line["end"] = line["words"][-1]["end"]
+        yield line
+
+def chunk_words_into_readable_lines(words, max_gap=0.60, max_words=8):
+    if hasattr(words, "chunk_lines"):
+        return words.chunk_lines(max_gap=max_gap, max_words=max_words)
+    return list(iter_readable_lines(words, max_gap=max_gap, max_words=max_words))
+
+_RTL_RE = re.compile("[\u0590-\u05FF\u0600-\u06FF\u0750-\u077F]+")
+_NON_LETTER_RE = re.compile(r"[\W\d_]+")
+_PUNCT_TABLE = str.maketrans({".": None, ",": None, "،": None, "?": "؟", ";": "؛"})
+_PUNCT_CACHE = {}
+
+# precompiled karaoke templates (S17-17 FINAL)
+_LTR_TOKEN = "{\\k%d\\c&H00FFFF&\\b1}%s{\\b0\\c&HFFFFFF&}"
+_RTL_TOKEN = ("{\\t(%d,%d,\\c&H00FFFF&\\3c&H000000&\\bord5\\b1\\fscx125\\fscy125)}%s"
+              "{\\t(%d,%d,\\c&HFFFFFF&\\3c&H000000&\\bord4\\b0\\fscx100\\fscy100)}")
+# "light" karaoke: same look with tags libass can render from its glyph cache. Colour-only
+# changes don't force a re-layout/re-raster; the bold/border/125% scale animation does.
+# LTR lines are \kf sweeps (yellow primary over white secondary). RTL lines keep the repo's
+# reversed visual word order, where \k can't work (it advances in text order), so they keep
+# absolute per-word times but animate colour only.
+_LTR_LIGHT_PREFIX = "{\\an2\\1c&H00FFFF&\\2c&HFFFFFF&}"
+_LTR_LIGHT_TOKEN = "{\\kf%d}%s"
+_RTL_LIGHT_TOKEN = "{\\t(%d,%d,\\c&H00FFFF&)}%s{\\t(%d,%d,\\c&HFFFFFF&)}"
+_DIALOGUE = "Dialogue: 0,%s,%s,Caption,,0,0,0,,%s"
+KARAOKE_STYLES = ("full", "light")
 
 def is_rtl_text(text):
-    rtl_chars = 0
-    total_chars = 0
-    
-    for char in text:
-        if char.isalpha():
-            total_chars += 1
-            if '\u0600' <= char <= '\u06FF' or '\u0750' <= char <= '\u077F' or '\u0590' <= char <= '\u05FF':
-                rtl_chars += 1
-    
-    if total_chars == 0:
+    letters = _NON_LETTER_RE.sub("", text)
+    if not letters.isalpha():
+        letters = "".join(filter(str.isalpha, letters))
+    if not letters:
         return False
-    
-    return rtl_chars / total_chars > 0.5
+    rtl_chars = sum(map(len, _RTL_RE.findall(letters)))
+    return rtl_chars / len(letters) > 0.5
+
+def fix_punct(s: str) -> str:
+    # single pass over the translation table, memoized per distinct word
+    r = _PUNCT_CACHE.get(s)
+    if r is None:
+        if len(_PUNCT_CACHE) > 100000:
+            _PUNCT_CACHE.clear()
+        r = _PUNCT_CACHE[s] = s.translate(_PUNCT_TABLE)
+    return r
+
+def _word_columns(words):
+    """(texts, starts, ends) of the words that have text; a WordTable line is read column-wise, without dicts."""
+    if hasattr(words, "columns"):
+        rows = zip(*words.columns())
+    else:
+        rows = ((w.get("text") or "", w["start"], w["end"]) for w in words)
+    texts, starts, ends = [], [], []
+    for t, a, b in rows:
+        t = t.strip()
+        if t:
+            texts.append(t)
+            starts.append(float(a))
+            ends.append(float(b))
+    return texts, starts, ends
 
-def make_ass(lines, style="Caption"):
+def make_ass_line(ln, style="Caption", karaoke="full"):
     """
-    S17-17 FINAL: Yellow 125% with Strong Outline
+    One karaoke Dialogue line (without newline) for a readable line, or None if it has no words.
+    S17-17 FINAL: Yellow 125% with Strong Outline; karaoke="light" for the cheap-to-render tags.
     """
-    
-    def fix_punct(s: str) -> str:
-        s = s.replace(".", "").replace(",", "").replace("،", "")
-        return s.replace("?", "؟").replace(";", "؛")
+    texts, starts, ends = _word_columns(ln["words"])
+    if not texts:
+        return None
 
-    out = []
+    # direction is decided once per line
+    rtl = is_rtl_text("".join(texts))
+
+    line_start = starts[0]
+    line_end = ends[-1]
+    cache = _PUNCT_CACHE
+    kao_tokens = []
+    add = kao_tokens.append
+
+    if karaoke == "light":
+        if not rtl:
+            # \kf durations are cumulative: measure each word up to the next one's start
+            cs = [int(round((s - line_start) * 100)) for s in starts]
+            cs.append(max(cs[-1], int(round((line_end - line_start) * 100))))
+            carry = 0
+            for i, t in enumerate(texts):
+                t = cache.get(t) or fix_punct(t)
+                carry += cs[i + 1] - cs[i]
+                if t:
+                    add(_LTR_LIGHT_TOKEN % (carry, t))
+                    carry = 0
+            kao_text = _LTR_LIGHT_PREFIX + " ".join(kao_tokens)
+        else:
+            tmpl = _RTL_LIGHT_TOKEN
+            for t, s, e in zip(reversed(texts), reversed(starts), reversed(ends)):
+                t = cache.get(t) or fix_punct(t)
+                if t:
+                    end_ms = int((e - line_start) * 1000)
+                    add(tmpl % (int((s - line_start) * 1000), end_ms, t, end_ms, end_ms + 1))
+            kao_text = "{\\an2\\q2}" + " ".join(kao_tokens)
+    elif not rtl:
+        tmpl = _LTR_TOKEN
+        for t, s, e in zip(texts, starts, ends):
+            t = cache.get(t) or fix_punct(t)
+            if t:
+                add(tmpl % (int((e - s) * 100), t))
+        kao_text = "{\\an2}" + " ".join(kao_tokens)
+    else:
+        # S17-17 FINAL: Yellow 125% + Strong Outline
+        tmpl = _RTL_TOKEN
+        for t, s, e in zip(reversed(texts), reversed(starts), reversed(ends)):
+            t = cache.get(t) or fix_punct(t)
+            if t:
+                end_ms = int((e - line_start) * 1000)
+                add(tmpl % (int((s - line_start) * 1000), end_ms, t, end_ms, end_ms + 1))
+        kao_text = "{\\an2\\q2}" + " ".join(kao_tokens)
+
+    return _DIALOGUE % (fmt_ass_ts(line_start), fmt_ass_ts(line_end), kao_text)
 
+def make_ass(lines, style="Caption", karaoke="full"):
+    """
+    S17-17 FINAL: Yellow 125% with Strong Outline
+    """
+    out = []
     for ln in lines:
-        words = [w for w in ln["words"] if (w.get("text") or "").strip()]
-        if not words:
-            continue
+        dialogue = make_ass_line(ln, style=style, karaoke=karaoke)
+        if dialogue is not None:
+            out.append(dialogue)
+    return "\n".join(out) + "\n"
 
-        probe = " ".join((w["text"] or "").strip() for w in words)
-        rtl = is_rtl_text(probe)
+MEDIA_EXTS = (".mp4", ".mov", ".mkv", ".webm", ".avi", ".m4v", ".mp3", ".m4a", ".wav", ".flac", ".ogg", ".opus")
 
-        line_start = float(words[0]["start"])
-        line_end = float(words[-1]["end"])
+def probe_media(src):
+    """One ffprobe call: {"duration": seconds or None, "width": px or None, "height": px or None}."""
+    info = {"duration": None, "width": None, "height": None}
+    try:
+        out = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration:stream=codec_type,width,height",
+                              "-of", "json", src], capture_output=True, text=True).stdout
+        data = json.loads(out or "{}")
+    except (OSError, ValueError):
+        return info
+    try:
+        info["duration"] = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        pass
+    for st in data.get("streams", []):
+        if st.get("codec_type") == "video" and st.get("width"):
+            info["width"], info["height"] = st["width"], st["height"]
+            break
+    return info
 
-        if not rtl:
-            kao_tokens = []
+def probe_duration(src):
+    return probe_media(src)["duration"]
+
+def _shift_segments(segments, offset, ck=None, not_before=None):
+    """Offset segment words by `offset` seconds, drop words overlapping resumed ones, checkpoint each segment."""
+    for seg_end, words in segments:
+        if offset:
             for w in words:
-                t = fix_punct((w["text"] or "").strip())
-                if not t: continue
-                duration_cs = int((float(w["end"]) - float(w["start"])) * 100)
-                seg = r"{\k" + str(duration_cs) + r"\c&H00FFFF&\b1}" + t + r"{\b0\c&HFFFFFF&}"
-                kao_tokens.append(seg)
-            kao_text = r"{\an2}" + " ".join(kao_tokens)
-            out.append(f"Dialogue: 0,{fmt_ass_ts(line_start)},{fmt_ass_ts(line_end)},Caption,,0,0,0,,{kao_text}")
+                w["start"] += offset
+                w["end"] += offset
+            seg_end += offset
+        if not_before is not None:
+            words = [w for w in words if w["start"] >= not_before]
+        if ck is not None:
+            ck.append(seg_end, words)
+        yield from words
+
+def lookup_cache(inp, args):
+    """(cache_key, cache_dir, words) from the transcription cache: all None with --no-cache, words None on a miss."""
+    if args.no_cache:
+        return None, None, None
+    import transcript_cache
+    with _stage("cache"):
+        cache_dir = args.cache_dir or transcript_cache.DEFAULT_CACHE_DIR
+        backend = "whisperx" if importlib.util.find_spec("whisperx") else "faster-whisper"
+        cache_key = transcript_cache.cache_key(inp, model=args.model, compute_type=args.compute_type or "auto",
+                                               backend=backend, device="cpu" if args.cpu else "auto", sr=16000,
+                                               language=args.language or "auto",
+                                               **({"batch_size": args.batch_size} if args.batch_size else {}))
+        words = transcript_cache.load(cache_key, cache_dir)
+    return cache_key, cache_dir, words
+
+def iter_input_words(inp, args, shared=None, stats=None, checkpoint_path=None, cache=None):
+    """
+    Cache lookup -> decode -> ASR for one input file, yielding words as they become available.
+    `stats["audio_seconds"]` is filled in when the audio is decoded (it stays None on a cache hit).
+    The word list is stored in the transcription cache once the input is fully transcribed.
+    With `checkpoint_path`, finished segments are appended to a JSONL checkpoint as they arrive;
+    `args.resume` replays a compatible checkpoint and restarts ASR from its last segment end.
+    `cache` is an earlier lookup_cache() result, so the input isn't hashed twice.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("audio_seconds", None)
+    device_hint = "cpu" if args.cpu else None
+    cache_key, cache_dir, words = cache or lookup_cache(inp, args)
+    if words is not None:
+        print(f"[i] Using cached transcription: {inp}")
+        yield from words
+        return
+
+    collected = None
+    if cache_key:
+        from word_store import WordTableBuilder
+        collected = WordTableBuilder()  # columnar from the start: no list of word dicts for the cache
+    ck, header, saved, resume_at = None, None, [], 0.0
+    if checkpoint_path:
+        import checkpoint
+        job = {"input": os.path.abspath(inp), "size": os.path.getsize(inp), "model": args.model,
+               "compute_type": args.compute_type or "auto", "language": args.language or "auto"}
+        ck = checkpoint.Checkpoint(checkpoint_path, job)
+        if args.resume:
+            header, saved, resume_at = ck.load()
+            if header:
+                print(f"[i] Resuming at {resume_at:.1f}s with {len(saved)} words from {checkpoint_path}")
+    for w in saved:
+        if collected is not None:
+            collected.append(w)
+        yield w
+
+    loader = None
+    if args.jobs <= 1 and shared is None:
+        use_worker = False
+        if not args.no_worker:
+            import asr_worker
+            use_worker = asr_worker.worker_accepts(args.worker or asr_worker.DEFAULT_WORKER,
+                                                   model_name=args.model, compute_type=args.compute_type)
+        if not use_worker:
+            # the model is needed in-process: load it while ffmpeg decodes
+            loader = BackgroundLoad(prefer_whisperx=True, device_hint=device_hint, model_name=args.model,
+                                    compute_type=args.compute_type, batch_size=args.batch_size)
+
+    print(f"[i] Decoding audio: {inp}")
+    with ExitStack() as stack:
+        if ck is not None:
+            stack.callback(ck.close)
+        t0 = time.perf_counter()
+        with _stage_beside("decode", loader):
+            audio = stack.enter_context(audio_source(inp, sr=16000, use_tempfile=args.tempfile,
+                                                     start=resume_at or None))
+        decode_seconds = time.perf_counter() - t0
+        if not isinstance(audio, str):
+            stats["audio_seconds"] = resume_at + len(audio) / 16000
+        language = args.language or (header or {}).get("language")
+        if not language and args.detect_language:
+            with _stage_beside("language_detect", loader):
+                language = detect_language(audio, device_hint=device_hint)
+        stats["language"] = language
+        if ck is not None:
+            if header:
+                ck.reopen()
+            else:
+                ck.start(language=language)
+
+        print("[i] Transcribing + word timestamps…")
+        segments = None
+        if args.jobs > 1:
+            with _stage("transcribe"):
+                words = transcribe_parallel(audio, args.jobs, sr=16000, prefer_whisperx=True, device_hint=device_hint,
+                                            model_name=args.model, compute_type=args.compute_type, language=language,
+                                            batch_size=args.batch_size)
+            segments = [(words[-1]["end"] if words else 0.0, words)]
+        elif not args.no_worker and loader is None:
+            import asr_worker
+            with _stage("transcribe"):
+                words = asr_worker.remote_transcribe(audio, url=args.worker or asr_worker.DEFAULT_WORKER,
+                                                     model_name=args.model, compute_type=args.compute_type,
+                                                     language=language)
+            if words is not None:
+                print("[i] Transcribed by warm ASR worker")
+                segments = [(words[-1]["end"] if words else 0.0, words)]
+        if segments is None:
+            if shared is not None:
+                segments = shared.iter_segments(audio, language=language)
+            elif loader is not None:
+                t0 = time.perf_counter()
+                with _stage("model_load"):
+                    asr = loader.get()
+                wait = time.perf_counter() - t0
+                # sequentially this would have cost decode + load; overlapped it cost decode + wait
+                stats["overlap"] = {"decode_seconds": decode_seconds, "model_load_seconds": loader.seconds,
+                                    "model_load_cpu_seconds": loader.cpu_seconds,
+                                    "model_wait_seconds": wait, "saved_seconds": max(0.0, loader.seconds - wait)}
+                print(f"[i] Model loaded during decode; overlap saved {stats['overlap']['saved_seconds']:.1f}s")
+                segments = iter_segment_words(audio, asr, language=language)
+            else:
+                with _stage("model_load"):
+                    asr = load_asr(prefer_whisperx=True, device_hint=device_hint, model_name=args.model,
+                                   compute_type=args.compute_type, batch_size=args.batch_size)
+                segments = iter_segment_words(audio, asr, language=language)
+        not_before = saved[-1]["end"] - 0.05 if saved else None
+        for w in _profiled("transcribe", _shift_segments(segments, resume_at, ck=ck, not_before=not_before)):
+            if collected is not None:
+                collected.append(w)
+            yield w
+        if ck is not None:
+            ck.remove()
+    if collected:
+        import transcript_cache
+        with _stage("cache"):
+            transcript_cache.store(cache_key, collected.table(), cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+
+def _fill_missing_times(words, total):
+    """Words the aligner could not place (digits, symbols) get spread over the gap between their neighbours."""
+    i, n = 0, len(words)
+    while i < n:
+        if words[i]["start"] is not None and words[i]["end"] is not None:
+            i += 1
             continue
+        j = i
+        while j < n and (words[j]["start"] is None or words[j]["end"] is None):
+            j += 1
+        lo = words[i - 1]["end"] if i else 0.0
+        hi = words[j]["start"] if j < n else max(lo, total)
+        step = (hi - lo) / (j - i)
+        for k in range(i, j):
+            words[k]["start"], words[k]["end"] = lo + step * (k - i), lo + step * (k - i + 1)
+        i = j
+    return words
 
-        n = len(words)
-        
-        # S17-17 FINAL: Yellow 125% + Strong Outline
-        kao_tokens = []
-        for i in range(n-1, -1, -1):
-            w = words[i]
-            t = fix_punct((w["text"] or "").strip())
-            if not t: continue
-            start_ms = int((float(w["start"]) - line_start) * 1000)
-            end_ms = int((float(w["end"]) - line_start) * 1000)
-            kao_tokens.append(r"{\t(" + str(start_ms) + "," + str(end_ms) + r",\c&H00FFFF&\3c&H000000&\bord5\b1\fscx125\fscy125)}" + t + r"{\t(" + str(end_ms) + "," + str(end_ms+1) + r",\c&HFFFFFF&\3c&H000000&\bord4\b0\fscx100\fscy100)}")
-        out.append(f"Dialogue: 0,{fmt_ass_ts(line_start)},{fmt_ass_ts(line_end)},Caption,,0,0,0,,{{\\an2\\q2}}" + " ".join(kao_tokens))
+ALIGN_PIECE_SECONDS = 60.0  # wav2vec2 alignment memory grows with the square of the length: align ~1 min at a time
 
-    return "\n".join(out) + "\n"
+def split_transcript(text, weights):
+    """
+    Share the words of `text` between consecutive audio pieces in proportion to `weights` (their
+    seconds of speech). Each boundary snaps to the nearest sentence or line end within a few words.
+    """
+    words, ends = [], []
+    for ln in text.splitlines():
+        for w in ln.split():
+            words.append(w)
+            ends.append(w[-1] in ".!?؟…:;")
+        if ends:
+            ends[-1] = True
+    if not words:
+        return ["" for _ in weights]
+    import numpy as np
+    chars = np.cumsum([len(w) + 1 for w in words])
+    share = np.cumsum(weights) / max(sum(weights), 1e-9)
+    bounds = [0]
+    for f in share[:-1]:
+        b = min(len(words), int(np.searchsorted(chars, f * chars[-1])) + 1)
+        win = min(20, max(2, (b - bounds[-1]) // 5))
+        snaps = [i for i in range(max(bounds[-1] + 1, b - win), min(len(words), b + win) + 1) if ends[i - 1]]
+        b = min(snaps, key=lambda i: abs(i - b)) if snaps else b
+        bounds.append(max(bounds[-1], b))
+    bounds.append(len(words))
+    return [" ".join(words[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+def align_transcript(audio, text, language, device_hint=None, sr=16000):
+    """
+    Forced alignment of a known transcript: only the WhisperX alignment (wav2vec2) model runs,
+    no speech recognition. The audio is split at silences into pieces of about ALIGN_PIECE_SECONDS,
+    each gets its share of the text (split_transcript) and is aligned on its own, so memory stays
+    bounded for long recordings. Returns [{"text", "start", "end"}, ...] for every word of `text`.
+    """
+    import numpy as np
+    import whisperx
+    import align_cache
+    device = pick_device(device_hint)
+    if isinstance(audio, str):
+        audio = whisperx.load_audio(audio, sr=sr)
+    total = len(audio) / sr
+    cuts = [0] + find_silence_cuts(audio, sr=sr, target_len=ALIGN_PIECE_SECONDS,
+                                   search=ALIGN_PIECE_SECONDS / 6) + [len(audio)]
+    pieces = list(zip(cuts[:-1], cuts[1:]))
+    hop = sr // 50
+    speech = []
+    for a, b in pieces:
+        n = (b - a) // hop
+        rms = np.sqrt(np.mean(np.square(audio[a:a + n * hop].reshape(n, hop)), axis=1)) if n else np.zeros(0)
+        speech.append(max(np.count_nonzero(rms > 0.01) * hop / sr, 1e-3))  # frames above -40 dBFS
+    segments = [{"start": a / sr, "end": b / sr, "text": t}
+                for (a, b), t in zip(pieces, split_transcript(text, speech)) if t]
+    with _stage("align_model_load"):
+        align_model, meta = align_cache.get_align_model(language, device)
+    with _stage("align"):
+        aligned = whisperx.align(segments, align_model, meta, audio, device)
+    words = []
+    for seg in aligned["segments"]:
+        for w in seg.get("words", []):
+            t = (w.get("word") or "").strip()
+            if t:
+                words.append({"text": t, "start": w.get("start"), "end": w.get("end")})
+                if w.get("score") is not None:
+                    words[-1]["prob"] = round(float(w["score"]), 3)
+    return _fill_missing_times(words, total)
 
+def iter_transcript_words(inp, args, stats=None):
+    """--transcript mode: decode, then align the supplied text instead of transcribing."""
+    stats = stats if stats is not None else {}
+    with open(args.transcript, "r", encoding="utf-8") as f:
+        text = f.read()
+    if not text.strip():
+        raise SystemExit(f"Transcript is empty: {args.transcript}")
+    device_hint = "cpu" if args.cpu else None
+    print(f"[i] Decoding audio: {inp}")
+    with ExitStack() as stack:
+        with _stage("decode"):
+            audio = stack.enter_context(audio_source(inp, sr=16000, use_tempfile=args.tempfile))
+        if not isinstance(audio, str):
+            stats["audio_seconds"] = len(audio) / 16000
+        language = args.language
+        if not language:
+            with _stage("language_detect"):
+                language = detect_language(audio, device_hint=device_hint)
+        stats["language"] = language
+        print(f"[i] Aligning transcript ({len(text.split())} words, no ASR): {args.transcript}")
+        words = align_transcript(audio, text, language, device_hint=device_hint)
+    yield from words
+
+def transcribe_clips(clips, args, language=None):
+    """
+    Yields the word list of each clip (array or WAV path) in turn, with clip-relative times.
+    The warm ASR worker is asked first (unless --no-worker); once it declines, a model is
+    loaded in-process, once, for the remaining clips.
+    """
+    use_worker, asr = not args.no_worker, None
+    for clip in clips:
+        words = None
+        if use_worker:
+            import asr_worker
+            with _stage("transcribe"):
+                words = asr_worker.remote_transcribe(clip, url=args.worker or asr_worker.DEFAULT_WORKER,
+                                                     model_name=args.model, compute_type=args.compute_type,
+                                                     language=language)
+            use_worker = words is not None
+        if words is None:
+            if asr is None:
+                with _stage("model_load"):
+                    asr = load_asr(prefer_whisperx=True, device_hint="cpu" if args.cpu else None,
+                                   model_name=args.model, compute_type=args.compute_type,
+                                   batch_size=args.batch_size)
+            words = list(_profiled("transcribe", iter_word_timestamps(clip, asr, language=language)))
+        yield words
 
+def _transcribe_windows(audio, windows, args, language, pad=0.5, sr=16000):
+    """
+    ASR on [start, end) windows of a decoded array, each with `pad` s of context on both sides.
+    Times come back absolute; a word belongs to the window holding its midpoint.
+    """
+    bounds = [(max(0, int((start - pad) * sr)), min(len(audio), int((end + pad) * sr))) for start, end in windows]
+    out = []
+    clips = transcribe_clips((audio[a:b] for a, b in bounds), args, language=language)
+    for (start, end), (a, b), words in zip(windows, bounds, clips):
+        for w in words:
+            w["start"] += a / sr
+            w["end"] += a / sr
+            if start <= (w["start"] + w["end"]) / 2 < end:
+                out.append(w)
+    return out
 
-def main():
-    ap = argparse.ArgumentParser(description="S17-17 Final: RTL Karaoke Subtitle Generator")
-    ap.add_argument("--in", dest="inp", required=True, help="Input video/audio file")
+def iter_reedit_words(inp, ass_path, args, stats=None):
+    """
+    --previous mode: `inp` is a re-edit of args.previous, whose words are in args.previous_words
+    (default: the sidecar next to the ASS). Regions of the new audio found in the old audio keep
+    their old words with shifted times; only inserted or changed spans, and words cut by an edit,
+    go through ASR. The old words are read right away, before the writers replace that sidecar.
+    """
+    import subtitle_writers
+    path = args.previous_words or subtitle_writers.sidecar_path(ass_path)
+    if not os.path.isfile(path):
+        raise SystemExit(f"--previous needs the old words: --previous-words <old>.words.jsonl or a --formats json file "
+                         f"(not found: {path})")
+    old_words = subtitle_writers.read_word_list(path)
+    if not old_words:
+        raise SystemExit(f"No words in {path}")
+    return _reedit_words(inp, args, old_words, stats if stats is not None else {})
+
+def _reedit_words(inp, args, old_words, stats):
+    import bisect
+    import audio_diff
+    from concurrent.futures import ThreadPoolExecutor
+    print(f"[i] Decoding audio: {args.previous} (previous) and {inp}")
+    with _stage("decode"):
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            old_audio = pool.submit(decode_audio, args.previous, 16000)
+            audio = decode_audio(inp, sr=16000)
+            old_audio = old_audio.result()
+    seconds = stats["audio_seconds"] = len(audio) / 16000
+    with _stage("fingerprint"):
+        fp_old = audio_diff.fingerprint(old_audio)
+        del old_audio
+        fp_new = audio_diff.fingerprint(audio)
+    with _stage("audio_diff"):
+        matches, changed = audio_diff.align(fp_old, fp_new)
+        kept, partial = audio_diff.remap_words(old_words, matches)
+        windows = audio_diff.retranscribe_windows(changed + partial, kept, seconds)
+    matched = sum(m["end"] - m["start"] for m in matches)
+    asr_seconds = sum(b - a for a, b in windows)
+    print(f"[i] {matched / max(seconds, 1e-9):.0%} of the new audio found in the previous one "
+          f"({len(matches)} regions); reusing {len(kept)}/{len(old_words)} words")
+    print(f"[i] Re-transcribing {len(windows)} spans: {asr_seconds:.1f}s of {seconds:.1f}s")
+
+    fresh = []
+    if windows:
+        language = args.language
+        if not language:
+            # short spans are too little audio for Whisper to tell the language reliably
+            with _stage("language_detect"):
+                language = detect_language(audio, device_hint="cpu" if args.cpu else None)
+        stats["language"] = language
+        starts = [w["start"] for w in kept]
+        for w in _transcribe_windows(audio, windows, args, language):
+            # window edges can hear a kept neighbour again
+            i = bisect.bisect_right(starts, (w["start"] + w["end"]) / 2) - 1
+            if i < 0 or kept[i]["end"] < (w["start"] + w["end"]) / 2:
+                fresh.append(w)
+    stats["reedit"] = {"regions": len(matches), "matched_seconds": matched, "reused_words": len(kept),
+                       "new_words": len(fresh), "windows": len(windows), "transcribed_seconds": asr_seconds}
+    yield from sorted(kept + fresh, key=lambda w: w["start"])
+
+def tune_model(sample_src, args):
+    import model_tuner
+    args.model, args.compute_type = model_tuner.pick_config(
+        sample_src, args.rtf_target, prefer_whisperx=True, device_hint="cpu" if args.cpu else None,
+        language=args.language, batch_size=args.batch_size)
+
+def process_file(inp, ass_path, args, shared=None, out_video=None, word_filter=None):
+    """
+    Transcribe one input and stream its ASS (and burned video with --burn). Returns a stats dict.
+    Each Dialogue line is appended to the file as soon as it is final.
+    `word_filter` maps the word stream before line chunking (e.g. captionize.py correction rules).
+    """
+    t0 = time.time()
+    stats = {"words": 0, "lines": 0}
+
+    def counted(words):
+        for w in words:
+            stats["words"] += 1
+            yield w
+
+    import subtitle_writers
+    formats = subtitle_writers.parse_formats(getattr(args, "formats", None))
+    w, h = map(int, args.playres.lower().split("x"))
+    header = ass_header(font=args.font, fontsize=args.fontsize, playres=(w, h), alignment=args.align)
+    checkpoint_path = None if args.no_checkpoint else ass_path + ".ckpt.jsonl"
+    if getattr(args, "transcript", None):
+        source = iter_transcript_words(inp, args, stats=stats)
+    elif getattr(args, "previous", None):
+        source = iter_reedit_words(inp, ass_path, args, stats=stats)
+    else:
+        cache = lookup_cache(inp, args)
+        if cache[2] is not None and word_filter is None:
+            # the cache entry is already a WordTable: split lines vectorized, render from its columns
+            print(f"[i] Using cached transcription: {inp}")
+            source, cache = cache[2], None
+        else:
+            source = iter_input_words(inp, args, shared=shared, stats=stats, checkpoint_path=checkpoint_path,
+                                      cache=cache)
+    if word_filter is not None:
+        source = word_filter(source)
+    if hasattr(source, "iter_lines"):
+        stats["words"] = len(source)
+        words = source
+    else:
+        words = counted(source)
+    print(f"[i] Streaming readable lines into {', '.join(f.upper() for f in formats)}…")
+    render = functools.partial(make_ass_line, karaoke=getattr(args, "karaoke", "full"))
+    writers = subtitle_writers.open_writers(ass_path, formats, ass_header=header, render=render,
+                                            sidecar=not getattr(args, "no_sidecar", False))
+    try:
+        for ln in _profiled("chunk", iter_readable_lines(words, max_gap=args.gap, max_words=args.maxwords)):
+            with _stage("ass_write"):
+                wrote = False
+                for wr in writers:
+                    wrote = wr.write_line(ln) or wrote
+                    wr.flush()
+            if wrote:
+                stats["lines"] += 1
+    finally:
+        for wr in writers:
+            wr.close()
+    if not stats["words"]:
+        for wr in writers:
+            os.remove(wr.path)
+        raise SystemExit(f"No words recognized: {inp}")
+    for wr in writers:
+        print(f"[✓] Wrote {wr.path.rsplit('.', 1)[-1].upper()}: {wr.path}")
+    stats["outputs"] = [wr.path for wr in writers]
+
+    if args.burn and out_video:
+        print("[i] Burning subtitles with FFmpeg…")
+        with _stage("burn"):
+            run(["ffmpeg", "-y", "-i", inp, "-vf", f"ass={ass_path}", "-c:a", "copy", out_video])
+        print(f"[✓] Wrote video: {out_video}")
+
+    stats["seconds"] = time.time() - t0
+    return stats
+
+def transcribe_window(inp, args, start, end):
+    """Words of [start, end) only: ffmpeg seeks to `start`, timestamps come back absolute."""
+    device_hint = "cpu" if args.cpu else None
+    language = args.language
+    if not language and args.detect_language:
+        # the same first-30 s detection a full run does, rather than guessing from a short window
+        with _stage("language_detect"):
+            language = detect_language(inp, device_hint=device_hint)
+    print(f"[i] Decoding window {start:.2f}s–{end:.2f}s: {inp}")
+    with ExitStack() as stack:
+        with _stage("decode"):
+            audio = stack.enter_context(audio_source(inp, sr=16000, use_tempfile=args.tempfile,
+                                                     start=start, duration=end - start))
+        words = next(transcribe_clips([audio], args, language=language))
+    out = []
+    for w in words:
+        w["start"] += start
+        w["end"] += start
+        if start <= (w["start"] + w["end"]) / 2 < end:
+            out.append(w)
+    return out
+
+def _patch_cache(inp, args, start, end, words):
+    """Swap the cached transcript's words in [start, end) (by midpoint, as transcribe_window keeps them) for `words`."""
+    cache_key, cache_dir, cached = lookup_cache(inp, args)
+    if cached is None:
+        return
+    import transcript_cache
+    from word_store import WordTableBuilder
+    merged, placed = WordTableBuilder(), False
+    for w in cached:
+        mid = (w["start"] + w["end"]) / 2
+        if mid >= start and not placed:
+            for nw in words:
+                merged.append(nw)
+            placed = True
+        if not start <= mid < end:
+            merged.append(w)
+    if not placed:
+        for nw in words:
+            merged.append(nw)
+    with _stage("cache"):
+        transcript_cache.store(cache_key, merged.table(), cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+    print(f"[i] Updated cached transcription: {inp}")
+
+def patch_ass_window(inp, ass_path, args, start, end):
+    """
+    Re-transcribe [start, end) of `inp` and replace the Dialogue lines of an existing ASS that
+    overlap it. The window is widened to cover those lines completely so no words are lost at
+    its edges; header, styles and every other line are left byte-for-byte as they were.
+    A <stem>.words.jsonl sidecar next to the ASS is patched the same way, SRT/VTT/JSON outputs next
+    to it are rewritten from the patched sidecar, and the cached transcript gets the new words, so a
+    later layout-only rerun keeps the fix.
+    """
+    import subtitle_writers
+    if not os.path.isfile(ass_path):
+        raise SystemExit(f"--start/--end patch an existing ASS; not found: {ass_path}")
+    with open(ass_path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines(keepends=True)
+
+    spans = []
+    for i, ln in enumerate(lines):
+        if ln.startswith("Dialogue:"):
+            fields = ln[len("Dialogue:"):].split(",", 3)
+            spans.append((i, parse_ass_ts(fields[1]), parse_ass_ts(fields[2])))
+    while True:
+        # widening can make lines already passed over overlap too: repeat until the window settles
+        hits = [(i, a, b) for i, a, b in spans if a < end and b > start]
+        lo, hi = min([start] + [a for _, a, _ in hits]), max([end] + [b for _, _, b in hits])
+        if (lo, hi) == (start, end):
+            break
+        start, end = lo, hi
+    hits = [i for i, _, _ in hits]
+    if hits:
+        print(f"[i] Replacing {len(hits)} Dialogue lines in {start:.2f}s–{end:.2f}s")
+
+    words = transcribe_window(inp, args, start, end)
+    new, new_words = [], []
+    for ln in _profiled("chunk", iter_readable_lines(words, max_gap=args.gap, max_words=args.maxwords)):
+        dialogue = make_ass_line(ln, style="Caption", karaoke=args.karaoke)
+        if dialogue is not None:
+            new.append(dialogue + "\n")
+            new_words.append([w for w in ln["words"] if (w.get("text") or "").strip()])
+
+    if hits:
+        at = hits[0]
+    else:
+        # keep Dialogue lines in time order: insert before the first one starting after the window
+        at = len(lines)
+        for i, ln in enumerate(lines):
+            if ln.startswith("Dialogue:") and parse_ass_ts(ln[len("Dialogue:"):].split(",", 3)[1]) >= end:
+                at = i
+                break
+    if at == len(lines) and lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    drop = set(hits)
+    kept = [ln for i, ln in enumerate(lines[:at]) if i not in drop]
+    rest = [ln for i, ln in enumerate(lines[at:], at) if i not in drop]
+
+    tmp = ass_path + ".tmp"
+    with _stage("ass_write"):
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(kept + new + rest)
+        os.replace(tmp, ass_path)
+
+        side, patched = subtitle_writers.sidecar_path(ass_path), None
+        if os.path.isfile(side):
+            # sidecar records are the Dialogue lines in order, so map file lines to Dialogue indices
+            index = {}
+            for i, ln in enumerate(lines):
+                if ln.startswith("Dialogue:"):
+                    index[i] = len(index)
+            records = subtitle_writers.read_sidecar(side)
+            if len(records) != len(index):
+                print(f"[!] {side} doesn't match {ass_path} ({len(records)} vs {len(index)} lines); not patched")
+            else:
+                drop_idx = {index[i] for i in hits}
+                at_idx = sum(1 for i in index if i < at)
+                fresh = [subtitle_writers.sidecar_record(0, ws) for ws in new_words]
+                records = ([r for j, r in enumerate(records[:at_idx]) if j not in drop_idx] + fresh +
+                           [r for j, r in enumerate(records[at_idx:], at_idx) if j not in drop_idx])
+                subtitle_writers.write_sidecar(side, records)
+                patched = records
+
+        stem = os.path.splitext(ass_path)[0]
+        requested = subtitle_writers.parse_formats(getattr(args, "formats", None))
+        others = [f for f in subtitle_writers.FORMATS
+                  if f != "ass" and (f in requested or os.path.isfile(f"{stem}.{f}"))]
+        if others and patched is None:
+            print(f"[!] {', '.join(f.upper() for f in others)} next to {ass_path} not updated: "
+                  f"needs a matching {side}")
+        elif others:
+            writers = subtitle_writers.open_writers(ass_path, others, sidecar=False)
+            try:
+                for rec in patched:
+                    for wr in writers:
+                        wr.write_line(rec)
+            finally:
+                for wr in writers:
+                    wr.close()
+            for wr in writers:
+                print(f"[✓] Rewrote {wr.path.rsplit('.', 1)[-1].upper()}: {wr.path}")
+    _patch_cache(inp, args, start, end, words)
+    print(f"[✓] Patched ASS: {ass_path} (-{len(hits)} / +{len(new)} lines, {len(words)} words)")
+    return {"words": len(words), "lines": len(new), "replaced": len(hits), "audio_seconds": end - start}
+
+def collect_inputs(in_dir=None, pattern=None, manifest=None):
+    paths = []
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            paths += [ln.strip() for ln in f if ln.strip() and not ln.lstrip().startswith("#")]
+    if in_dir or pattern:
+        found = glob.glob(os.path.join(in_dir or ".", pattern or "*"))
+        paths += sorted(p for p in found if os.path.isfile(p)
+                        and (pattern or p.lower().endswith(MEDIA_EXTS)))
+    return list(dict.fromkeys(paths))
+
+def batch_outputs(inputs, out_dir=None):
+    """
+    {input: (ass_path, out_video)}: <stem>.ass and <stem>_subbed<ext> in `out_dir` or next to the input.
+    Inputs that would share an output (talk.mp4 and talk.m4a, or a/clip.mp4 and b/clip.mp4 with one
+    out_dir) get -2, -3, ... after the stem in input order, so concurrent workers never write the same files.
+    """
+    outputs, taken = {}, set()
+    for inp in inputs:
+        stem, ext = os.path.splitext(os.path.basename(inp))
+        d = out_dir or os.path.dirname(inp) or "."
+        key = lambda name: os.path.normcase(os.path.abspath(os.path.join(d, name))).lower()
+        name, n = stem, 1
+        while key(name) in taken:
+            n += 1
+            name = f"{stem}-{n}"
+        taken.add(key(name))
+        if n > 1:
+            print(f"[!] Output name {stem} is already used in this batch; writing {inp} as {name}")
+        outputs[inp] = (os.path.join(d, name + ".ass"), os.path.join(d, f"{name}_subbed{ext}"))
+    return outputs
+
+def run_batch(inputs, args, word_filter=None, file_args=None, burn=None, burn_workers=1,
+              report_name="batch_report.json"):
+    """
+    Process many inputs in this process with `args.workers` threads fed from a bounded queue.
+    The model is loaded once and shared; a failing file is recorded and the batch continues.
+    Hooks (captionize.py): `file_args(inp, args)` returns the options for one input, `word_filter`
+    is passed to process_file, and with --burn `burn(rec)` replaces the in-line ffmpeg call and runs
+    in its own pool of `burn_workers` threads, so one file burns while the next is transcribed.
+    """
+    workers = max(1, args.workers)
+    shared = SharedASR(prefer_whisperx=True, device_hint="cpu" if args.cpu else None,
+                       model_name=args.model, compute_type=args.compute_type, workers=workers,
+                       batch_size=args.batch_size)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    t0 = time.time()
+    outputs = batch_outputs(inputs, args.out_dir)
+    jobs = queue.Queue(maxsize=workers * 2)
+    results, results_lock = [], threading.Lock()
+    burn_pool = None
+    if burn is not None and args.burn:
+        from concurrent.futures import ThreadPoolExecutor
+        burn_pool = ThreadPoolExecutor(max_workers=max(1, burn_workers))
+
+    def finish(rec):
+        with results_lock:
+            results.append(rec)
+
+    def burn_stage(rec):
+        b0 = time.time()
+        print(f"[i] Burning subtitles: {rec['video']}")
+        try:
+            burn(rec)
+            rec["burn_seconds"] = time.time() - b0
+            print(f"[✓] Wrote video: {rec['video']}")
+        except (Exception, SystemExit) as e:
+            print(f"[!] Burn failed: {rec['input']}: {e}")
+            rec.update(ok=False, error=str(e))
+        finish(rec)
+
+    def worker():
+        while True:
+            inp = jobs.get()
+            if inp is None:
+                return
+            ass_path, out_video = outputs[inp]
+            rec = {"input": inp, "ass": ass_path, "video": out_video if args.burn else None}
+            try:
+                opts = file_args(inp, args) if file_args else args
+                stats = process_file(inp, ass_path, opts, shared=shared, word_filter=word_filter,
+                                     out_video=None if burn_pool else out_video)
+                seconds = stats.get("audio_seconds") or probe_duration(inp)
+                rec.update(stats, ok=True, audio_seconds=seconds,
+                           rtf=(stats["seconds"] / seconds) if seconds else None)
+            except (Exception, SystemExit) as e:
+                print(f"[!] Failed: {inp}: {e}")
+                rec.update(ok=False, error=str(e))
+            if burn_pool and rec["ok"]:
+                burn_pool.submit(burn_stage, rec)
+            else:
+                finish(rec)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for inp in inputs:
+        jobs.put(inp)
+    for _ in threads:
+        jobs.put(None)
+    for t in threads:
+        t.join()
+    if burn_pool:
+        burn_pool.shutdown(wait=True)
+
+    order = {p: i for i, p in enumerate(inputs)}
+    results.sort(key=lambda r: order[r["input"]])
+    ok = [r for r in results if r["ok"]]
+    report = {"total": len(results), "succeeded": len(ok), "failed": len(results) - len(ok),
+              "wall_seconds": time.time() - t0, "files": results}
+
+    report_path = args.report or os.path.join(args.out_dir or ".", report_name)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("\n[i] Batch summary")
+    for r in results:
+        if r["ok"]:
+            rtf = f"RTF {r['rtf']:.3f}" if r.get("rtf") is not None else "RTF n/a"
+            print(f"  [✓] {r['input']}  {r['words']} words  {r['seconds']:.1f}s  {rtf}")
+        else:
+            print(f"  [✗] {r['input']}  {r['error']}")
+    print(f"[i] {report['succeeded']}/{report['total']} succeeded in {report['wall_seconds']:.1f}s. "
+          f"Report: {report_path}")
+    return report
+
+def build_parser(add_help=True):
+    """bahmanPi.py's options; captionize.py reuses them as a parent parser."""
+    ap = argparse.ArgumentParser(description="S17-17 Final: RTL Karaoke Subtitle Generator", add_help=add_help)
+    ap.add_argument("--in", dest="inp", help="Input video/audio file")
+    ap.add_argument("--in-dir", dest="in_dir", help="Batch: directory of inputs")
+    ap.add_argument("--glob", dest="pattern", help="Batch: glob pattern inside --in-dir (default: common media extensions)")
+    ap.add_argument("--manifest", dest="manifest", help="Batch: text file with one input path per line")
+    ap.add_argument("--out-dir", dest="out_dir", help="Batch: write outputs here instead of next to each input")
+    ap.add_argument("--workers", dest="workers", type=int, default=2, help="Batch: concurrent files")
+    ap.add_argument("--report", dest="report", help="Batch: summary JSON path (default: <out-dir>/batch_report.json)")
+    ap.add_argument("--profile", dest="profile", help="Write per-stage wall/CPU time, peak RSS and RTF as JSON here")
+    ap.add_argument("--cprofile", dest="cprofile", help="Also dump cProfile stats of one stage to this file (with --profile)")
+    ap.add_argument("--cprofile-stage", dest="cprofile_stage", default="transcribe",
+                    help="Stage recorded by --cprofile (decode, model_load, transcribe, align, chunk, ass_write, …)")
     ap.add_argument("--out", dest="out", default="out_ass.mp4", help="Output video")
     ap.add_argument("--ass", dest="ass", default="karaoke.ass", help="ASS output path")
+    ap.add_argument("--no-sidecar", dest="no_sidecar", action="store_true",
+                    help="Don't write the <ass stem>.words.jsonl word-timing sidecar for the editor")
+    ap.add_argument("--transcript", dest="transcript", default=None,
+                    help="Known transcript (UTF-8 text): skip ASR and only force-align it with WhisperX, "
+                         "about a minute of audio at a time")
+    ap.add_argument("--previous", dest="previous", default=None,
+                    help="Earlier cut of --in that was already captioned: reuse its words where the audio is unchanged")
+    ap.add_argument("--previous-words", dest="previous_words", default=None,
+                    help="Word list of --previous (.words.jsonl sidecar or --formats json; default: the sidecar next to --ass)")
+    ap.add_argument("--formats", dest="formats", default="ass",
+                    help="Comma-separated outputs written next to --ass: ass,srt,vtt,json")
     ap.add_argument("--font", dest="font", default="Vazirmatn", help="Subtitle font")
     ap.add_argument("--fontsize", dest="fontsize", type=int, default=64, help="Font size")
     ap.add_argument("--align", dest="align", type=int, default=3, help="Alignment")
     ap.add_argument("--playres", dest="playres", default="1080x1920", help="PlayResXxY")
     ap.add_argument("--burn", dest="burn", action="store_true", help="Burn subtitles")
+    ap.add_argument("--start", dest="start", default=None,
+                    help="Re-transcribe only from here (seconds or [h:]mm:ss) and patch the existing --ass")
+    ap.add_argument("--end", dest="end", default=None, help="End of the --start window (default: end of input)")
+    ap.add_argument("--karaoke-style", dest="karaoke", choices=KARAOKE_STYLES, default="full",
+                    help="full: animated colour/bold/125%% scale per word; light: \\kf sweeps / colour-only, much cheaper to burn")
     ap.add_argument("--gap", dest="gap", type=float, default=0.60, help="Max gap")
     ap.add_argument("--maxwords", dest="maxwords", type=int, default=8, help="Max words")
     ap.add_argument("--cpu", dest="cpu", action="store_true", help="Force CPU")
+    ap.add_argument("--model", dest="model", default="medium", help="Whisper model size (tiny, base, small, medium, large-v3, …)")
+    ap.add_argument("--compute-type", dest="compute_type", default=None, help="CTranslate2 compute type (default: float16 on CUDA, int8 on CPU)")
+    ap.add_argument("--rtf-target", dest="rtf_target", type=float, default=None,
+                    help="Auto-pick the most accurate model/compute type whose real-time factor meets this target")
+    ap.add_argument("--language", dest="language", default=None, help="Pin the spoken language (e.g. fa) and skip detection")
+    ap.add_argument("--detect-language", dest="detect_language", action="store_true",
+                    help="Detect the language once with the tiny model on the first 30 s and reuse it")
+    ap.add_argument("--align-model-dir", dest="align_model_dir", default=None,
+                    help="Local WhisperX alignment model dir (default: $CAPTIONIZE_ALIGN_DIR or ~/.cache/captionize/align)")
+    ap.add_argument("--align-cache-mb", dest="align_cache_mb", type=int, default=2048, help="Memory cap for cached alignment models")
+    ap.add_argument("--worker", dest="worker", default=None, help="ASR worker URL (default: $CAPTIONIZE_WORKER or http://127.0.0.1:8765)")
+    ap.add_argument("--no-worker", dest="no_worker", action="store_true", help="Always load the model in-process")
+    ap.add_argument("--tempfile", dest="tempfile", action="store_true", help="Decode via a temporary WAV instead of in memory")
+    ap.add_argument("--jobs", dest="jobs", type=int, default=1, help="Split on silence and transcribe in N processes")
+    ap.add_argument("--batch-size", dest="batch_size", type=int, default=0,
+                    help="Batched inference: decode N VAD speech chunks per model call (0 = sequential)")
+    ap.add_argument("--resume", dest="resume", action="store_true",
+                    help="Continue an interrupted transcription from <ass>.ckpt.jsonl")
+    ap.add_argument("--no-checkpoint", dest="no_checkpoint", action="store_true",
+                    help="Don't write the <ass>.ckpt.jsonl transcription checkpoint")
+    ap.add_argument("--no-cache", dest="no_cache", action="store_true", help="Ignore and don't update the transcription cache")
+    ap.add_argument("--cache-dir", dest="cache_dir", default=None, help="Transcription cache dir (default: $CAPTIONIZE_CACHE or ~/.cache/captionize/words)")
+    ap.add_argument("--cache-size", dest="cache_size", type=int, default=512, help="Transcription cache cap in MB (LRU eviction)")
+    return ap
+
+def main():
+    global PROFILER
+    ap = build_parser()
     args = ap.parse_args()
 
-    wav_path = os.path.splitext(os.path.basename(args.inp))[0] + ".wav"
-    print("[i] Extracting WAV…")
-    extract_wav(args.inp, wav_path, sr=16000)
+    import subtitle_writers
+    formats = subtitle_writers.parse_formats(args.formats)
+    if args.burn and "ass" not in formats:
+        ap.error("--burn needs ass in --formats")
 
-    device_hint = "cpu" if args.cpu else None
-    print("[i] Transcribing + word timestamps…")
-    words = transcribe_word_timestamps(wav_path, prefer_whisperx=True, device_hint=device_hint)
-    if not words:
-        raise SystemExit("No words recognized.")
+    import align_cache
+    align_cache.configure(model_dir=args.align_model_dir, max_bytes=args.align_cache_mb * 1024 * 1024)
 
-    print("[i] Chunking into readable lines…")
-    lines = chunk_words_into_readable_lines(words, max_gap=args.gap, max_words=args.maxwords)
+    if args.in_dir or args.pattern or args.manifest:
+        if args.profile or args.transcript or args.previous or args.start is not None or args.end is not None:
+            ap.error("--profile, --transcript, --previous and --start/--end work on a single --in file")
+        inputs = collect_inputs(args.in_dir, args.pattern, args.manifest)
+        if not inputs:
+            raise SystemExit("No input files found.")
+        if args.rtf_target:
+            tune_model(inputs[0], args)
+        report = run_batch(inputs, args)
+        if report["failed"]:
+            sys.exit(1)
+        return
+    if not args.inp:
+        ap.error("one of --in, --in-dir/--glob or --manifest is required")
+    if args.rtf_target:
+        tune_model(args.inp, args)
 
-    print("[i] Building ASS…")
-    w, h = map(int, args.playres.lower().split("x"))
-    header = ass_header(font=args.font, fontsize=args.fontsize, playres=(w, h), alignment=args.align)
-    body   = make_ass(lines, style="Caption")
-    with open(args.ass, "w", encoding="utf-8") as f:
-        f.write(header + body)
-    print(f"[✓] Wrote ASS: {args.ass}")
+    if args.profile:
+        import stage_profile
+        PROFILER = stage_profile.StageProfiler(cprofile_stage=args.cprofile_stage, cprofile_path=args.cprofile)
 
-    if args.burn:
-        print("[i] Burning subtitles with FFmpeg…")
-        run(["ffmpeg", "-y", "-i", args.inp, "-vf", f"ass={args.ass}", "-c:a", "copy", args.out])
-        print(f"[✓] Wrote video: {args.out}")
+    if args.transcript and (args.start is not None or args.end is not None):
+        ap.error("--transcript aligns the whole input; it can't be combined with --start/--end")
+    if args.previous and (args.transcript or args.start is not None or args.end is not None):
+        ap.error("--previous can't be combined with --transcript or --start/--end")
+    if args.start is not None or args.end is not None:
+        start = parse_time(args.start) if args.start is not None else 0.0
+        end = parse_time(args.end) if args.end is not None else probe_duration(args.inp)
+        if end is None or end <= start:
+            ap.error("--end must be after --start")
+        stats = patch_ass_window(args.inp, args.ass, args, start, end)
+        if args.burn:
+            print("[i] Burning subtitles with FFmpeg…")
+            with _stage("burn"):
+                run(["ffmpeg", "-y", "-i", args.inp, "-vf", f"ass={args.ass}", "-c:a", "copy", args.out])
+            print(f"[✓] Wrote video: {args.out}")
+    else:
+        stats = process_file(args.inp, args.ass, args, out_video=args.out)
+
+    if PROFILER:
+        seconds = stats.get("audio_seconds") or probe_duration(args.inp)
+        report = PROFILER.dump(args.profile, audio_seconds=seconds,
+                               extra={"input": args.inp, "words": stats["words"], "lines": stats["lines"],
+                                      "overlap": stats.get("overlap"), "reedit": stats.get("reedit")})
+        rtf = f"{report['rtf']:.3f}" if report["rtf"] is not None else "n/a"
+        print(f"[✓] Wrote profile: {args.profile} (RTF {rtf})")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the bahmanPi.py pipeline.
+Run: python benchmark.py render --words 200000
+     python benchmark.py --json stages.json stages --scales 60,600,7200
+     python benchmark.py stages --baseline stages.json   # fail on >20% per-stage regressions
+     python benchmark.py startup --budget-ms 500         # fail if --help / app import get slow
+     python benchmark.py batched --input talk.mp4 --batch-sizes 8,16   # real model: sequential vs batched
+     python benchmark.py ass-fps --seconds 30          # ffmpeg ass filter fps per karaoke style
+     python benchmark.py reedit --cuts 2.0,2.01,0.737   # --previous on cuts off the 20 ms fingerprint grid
+"""
+
+import argparse, json, os, platform, random, shutil, subprocess, sys, tempfile, time
+
+import bahmanPi
+
+PERSIAN_WORDS = ["سلام", "دوستان", "امروز", "می‌خواهیم", "درباره", "هوش", "مصنوعی", "صحبت", "کنیم،",
+                 "برنامه‌نویسی", "یکی", "از", "مهم‌ترین", "مهارت‌ها", "است.", "چرا؟", "ببینید;", "این",
+                 "دوره", "رباتیک", "و", "یاد", "می‌گیرید", "خیلی", "خوب"]
+ENGLISH_WORDS = ["hello", "world,", "Python", "model.", "why?", "data;", "GPU", "the", "and", "subtitle"]
+
+
+def synthetic_words(n, rtl_ratio=0.9, seed=0):
+    """
+    Deterministic transcript of `n` words: mostly Persian lines with some English ones,
+    word lengths of 0.15-0.6 s, short intra-phrase gaps and occasional pauses.
+    """
+    rnd = random.Random(seed)
+    words, t, rtl = [], 0.0, True
+    for i in range(n):
+        if i % 8 == 0:
+            rtl = rnd.random() < rtl_ratio
+        text = rnd.choice(PERSIAN_WORDS if rtl else ENGLISH_WORDS)
+        t += rnd.choice((0.02, 0.05, 0.08, 0.1, 0.9))
+        dur = rnd.uniform(0.15, 0.6)
+        words.append({"text": text, "start": round(t, 3), "end": round(t + dur, 3)})
+        t += dur
+    return words
+
+
+def reference_make_ass(lines, style="Caption"):
+    """The original string-concatenation renderer; the fast path must stay byte-identical to it."""
+    def fix_punct(s):
+        s = s.replace(".", "").replace(",", "").replace("،", "")
+        return s.replace("?", "؟").replace(";", "؛")
+
+    def is_rtl_text(text):
+        rtl_chars = 0
+        total_chars = 0
+        for char in text:
+            if char.isalpha():
+                total_chars += 1
+                if '\u0600' <= char <= '\u06FF' or '\u0750' <= char <= '\u077F' or '\u0590' <= char <= '\u05FF':
+                    rtl_chars += 1
+        if total_chars == 0:
+            return False
+        return rtl_chars / total_chars > 0.5
+
+    def fmt_ass_ts(t):
+        h = int(t // 3600)
+        m = int((t % 3600) // 60)
+        s = int(t % 60)
+        cs = int((t - int(t)) * 100)
+        return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+    out = []
+    for ln in lines:
+        words = [w for w in ln["words"] if (w.get("text") or "").strip()]
+        if not words:
+            continue
+        probe = " ".join((w["text"] or "").strip() for w in words)
+        rtl = is_rtl_text(probe)
+        line_start = float(words[0]["start"])
+        line_end = float(words[-1]["end"])
+        if not rtl:
+            kao_tokens = []
+            for w in words:
+                t = fix_punct((w["text"] or "").strip())
+                if not t: continue
+                duration_cs = int((float(w["end"]) - float(w["start"])) * 100)
+                seg = r"{\k" + str(duration_cs) + r"\c&H00FFFF&\b1}" + t + r"{\b0\c&HFFFFFF&}"
+                kao_tokens.append(seg)
+            kao_text = r"{\an2}" + " ".join(kao_tokens)
+            out.append(f"Dialogue: 0,{fmt_ass_ts(line_start)},{fmt_ass_ts(line_end)},Caption,,0,0,0,,{kao_text}")
+            continue
+        n = len(words)
+        kao_tokens = []
+        for i in range(n-1, -1, -1):
+            w = words[i]
+            t = fix_punct((w["text"] or "").strip())
+            if not t: continue
+            start_ms = int((float(w["start"]) - line_start) * 1000)
+            end_ms = int((float(w["end"]) - line_start) * 1000)
+            kao_tokens.append(r"{\t(" + str(start_ms) + "," + str(end_ms) + r",\c&H00FFFF&\3c&H000000&\bord5\b1\fscx125\fscy125)}" + t + r"{\t(" + str(end_ms) + "," + str(end_ms+1) + r",\c&HFFFFFF&\3c&H000000&\bord4\b0\fscx100\fscy100)}")
+        out.append(f"Dialogue: 0,{fmt_ass_ts(line_start)},{fmt_ass_ts(line_end)},Caption,,0,0,0,,{{\\an2\\q2}}" + " ".join(kao_tokens))
+    return "\n".join(out) + "\n"
+
+
+def make_test_audio(path, seconds, sr=16000):
+    """Synthetic speech-like audio from ffmpeg's lavfi sine source, gated to 3.5 s tones / 1.5 s silences."""
+    bahmanPi.run(["ffmpeg", "-y", "-v", "error", "-f", "lavfi",
+                  "-i", f"sine=frequency=220:sample_rate={sr}:duration={seconds}",
+                  "-af", "volume='if(lt(mod(t,5),3.5),1,0)':eval=frame",
+                  "-ac", "1", "-ar", str(sr), path])
+
+
+class _FakeWord:
+    __slots__ = ("word", "start", "end", "probability")
+
+    def __init__(self, word, start, end, probability):
+        self.word, self.start, self.end, self.probability = word, start, end, probability
+
+
+class _FakeSegment:
+    __slots__ = ("start", "end", "text", "words")
+
+    def __init__(self, words):
+        self.words = words
+        self.start, self.end = words[0].start, words[-1].end
+        self.text = "".join(w.word for w in words)
+
+
+class _FakeInfo:
+    def __init__(self, language, duration):
+        self.language, self.language_probability, self.duration = language, 1.0, duration
+
+
+class FakeWhisperModel:
+    """
+    Deterministic stand-in for faster_whisper.WhisperModel. transcribe() returns a lazy segment
+    generator with the same shape as the real one: `words_per_second` words, ~8 per segment,
+    optionally sleeping `rtf` seconds per audio second to emulate model compute.
+    """
+    def __init__(self, words_per_second=2.5, rtf=0.0, language="fa", seed=0, sr=16000):
+        self.words_per_second, self.rtf, self.language, self.seed, self.sr = words_per_second, rtf, language, seed, sr
+
+    def transcribe(self, audio, language=None, word_timestamps=True, vad_filter=True, **kwargs):
+        if isinstance(audio, str):
+            duration = bahmanPi.probe_duration(audio) or 0.0
+        else:
+            duration = len(audio) / self.sr
+        info = _FakeInfo(language or self.language, duration)
+
+        def segments():
+            rnd = random.Random(self.seed)
+            step = 1.0 / self.words_per_second
+            t, words = 0.0, []
+            while t + step <= duration:
+                dur = step * rnd.uniform(0.5, 0.9)
+                text = " " + rnd.choice(PERSIAN_WORDS)
+                words.append(_FakeWord(text, round(t, 3), round(t + dur, 3), rnd.uniform(0.5, 1.0)))
+                t += step * (3.0 if rnd.random() < 0.08 else 1.0)
+                if len(words) == 8:
+                    if self.rtf:
+                        time.sleep((words[-1].end - words[0].start) * self.rtf)
+                    yield _FakeSegment(words)
+                    words = []
+            if words:
+                yield _FakeSegment(words)
+        return segments(), info
+
+
+def fake_asr(words_per_second=2.5, rtf=0.0):
+    """A load_asr()-style handle backed by FakeWhisperModel, so the real iter_word_timestamps runs."""
+    return {"backend": "faster-whisper", "device": "cpu", "model_name": "fake", "compute_type": "none",
+            "model": FakeWhisperModel(words_per_second=words_per_second, rtf=rtf)}
+
+
+def timed(stages, name, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    stages[name] = time.perf_counter() - t0
+    return result
+
+
+def bench_stages(scales=(60, 600, 7200), words_per_second=2.5, rtf=0.0):
+    if not shutil.which("ffmpeg"):
+        raise SystemExit("ffmpeg is required for the stage benchmark")
+    results = []
+    tmp = tempfile.mkdtemp(prefix="captionize_bench_")
+    try:
+        for seconds in scales:
+            src = os.path.join(tmp, f"sine_{seconds}.wav")
+            make_test_audio(src, seconds)
+            stages = {}
+            timed(stages, "extract_wav", lambda: bahmanPi.extract_wav(src, os.path.join(tmp, "out.wav")))
+            audio = timed(stages, "decode_audio", lambda: bahmanPi.decode_audio(src))
+            asr = fake_asr(words_per_second=words_per_second, rtf=rtf)
+            words = timed(stages, "transcribe", lambda: bahmanPi.transcribe_word_timestamps(audio, asr=asr))
+            lines = timed(stages, "chunk", lambda: bahmanPi.chunk_words_into_readable_lines(words))
+            header = bahmanPi.ass_header()
+            body = timed(stages, "make_ass", lambda: bahmanPi.make_ass(lines))
+            ass_path = os.path.join(tmp, "out.ass")
+
+            def write():
+                with open(ass_path, "w", encoding="utf-8") as f:
+                    f.write(header + body)
+            timed(stages, "write", write)
+            results.append({"scale_seconds": seconds, "words": len(words), "lines": len(lines), "stages": stages})
+            print(f"[i] {seconds:>6}s audio, {len(words):>6} words: " +
+                  "  ".join(f"{k} {v:.3f}s" for k, v in stages.items()))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {"benchmark": "stages", "host": platform.node(), "python": platform.python_version(),
+            "words_per_second": words_per_second, "fake_rtf": rtf, "results": results}
+
+
+def compare_to_baseline(result, baseline, tolerance=0.2, min_seconds=0.005):
+    """Per-stage regressions (slower than baseline by more than `tolerance`) for matching scales."""
+    base = {r["scale_seconds"]: r["stages"] for r in baseline.get("results", [])}
+    regressions = []
+    for r in result["results"]:
+        old = base.get(r["scale_seconds"])
+        if not old:
+            continue
+        for stage, t in r["stages"].items():
+            t0 = old.get(stage)
+            if t0 and max(t, t0) >= min_seconds and t > t0 * (1 + tolerance):
+                regressions.append({"scale_seconds": r["scale_seconds"], "stage": stage,
+                                    "baseline": t0, "current": t, "ratio": t / t0})
+    return regressions
+
+
+def best_of(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, result
+
+
+def bench_render(n_words=200000, repeat=3, seed=0):
+    words = synthetic_words(n_words, seed=seed)
+    lines = bahmanPi.chunk_words_into_readable_lines(words)
+    t_ref, ref = best_of(lambda: reference_make_ass(lines), repeat)
+    t_new, new = best_of(lambda: bahmanPi.make_ass(lines), repeat)
+    if new != ref:
+        raise SystemExit("make_ass output differs from the reference renderer")
+    return {
+        "benchmark": "render",
+        "words": n_words,
+        "lines": len(lines),
+        "reference_seconds": t_ref,
+        "fast_seconds": t_new,
+        "reference_words_per_second": n_words / t_ref,
+        "fast_words_per_second": n_words / t_new,
+        "speedup": t_ref / t_new,
+        "byte_identical": True,
+    }
+
+
+def bench_batched(src, model_name="small", compute_type=None, batch_sizes=(8, 16), device_hint="cpu",
+                  seconds=None, language=None):
+    """
+    Real faster-whisper on one input: the sequential vad_filter path against BatchedInferencePipeline
+    at each batch size. Audio is decoded once and each model is loaded before timing starts, so
+    the numbers are transcription only (words included, as the pipeline needs them).
+    """
+    audio = bahmanPi.decode_audio(src, duration=seconds)
+    audio_seconds = len(audio) / 16000
+    runs = []
+    for bs in [0] + [b for b in batch_sizes if b > 0]:
+        asr = bahmanPi.load_asr(prefer_whisperx=False, device_hint=device_hint, model_name=model_name,
+                                compute_type=compute_type, batch_size=bs)
+        t0 = time.perf_counter()
+        words = list(bahmanPi.iter_word_timestamps(audio, asr, language=language))
+        dt = time.perf_counter() - t0
+        runs.append({"batch_size": bs, "seconds": dt, "rtf": dt / audio_seconds, "words": len(words)})
+        del asr
+    base = runs[0]["seconds"]
+    for r in runs:
+        r["speedup"] = base / r["seconds"]
+    return {"benchmark": "batched", "input": src, "model": model_name, "compute_type": compute_type,
+            "device": device_hint or bahmanPi.pick_device(), "audio_seconds": audio_seconds,
+            "cpu_count": os.cpu_count(), "runs": runs}
+
+
+def bench_ass_fps(seconds=30, playres=(1080, 1920), fps=30, font="Vazirmatn", fontsize=64, rtl_ratio=0.9,
+                  repeat=1):
+    """
+    ffmpeg `ass` filter throughput per karaoke style: the same synthetic transcript rendered as
+    full and light karaoke over a blank `seconds` long video (decode and encode cost is nil).
+    """
+    words = [w for w in synthetic_words(int(seconds * 4), rtl_ratio=rtl_ratio) if w["end"] < seconds]
+    lines = bahmanPi.chunk_words_into_readable_lines(words)
+    header = bahmanPi.ass_header(font=font, fontsize=fontsize, playres=playres, alignment=2)
+    frames = int(seconds * fps)
+    tmp = tempfile.mkdtemp(prefix="captionize_assfps_")
+    results = {}
+    try:
+        for style in bahmanPi.KARAOKE_STYLES:
+            path = os.path.join(tmp, f"{style}.ass")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(header + bahmanPi.make_ass(lines, karaoke=style))
+            cmd = ["ffmpeg", "-nostdin", "-v", "error", "-f", "lavfi",
+                   "-i", f"color=c=black:s={playres[0]}x{playres[1]}:r={fps}:d={seconds}",
+                   "-vf", f"ass={path}", "-f", "null", "-"]
+            wall, _ = best_of(lambda: bahmanPi.run(cmd), repeat)
+            results[style] = {"seconds": wall, "fps": frames / wall, "bytes": os.path.getsize(path)}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    full = results["full"]["seconds"]
+    for r in results.values():
+        r["speedup_vs_full"] = full / r["seconds"]
+    return {"benchmark": "ass-fps", "video_seconds": seconds, "frames": frames, "playres": list(playres),
+            "words": len(words), "lines": len(lines), "styles": results}
+
+
+def speechlike_audio(seconds, sr=16000, seed=0):
+    """Band-limited noise gated on/off in 200 ms steps (~80% voiced): syllable-like texture for fingerprinting."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    x = np.convolve(rng.standard_normal(n), np.ones(8) / 8, "same")
+    gate = np.repeat(rng.uniform(0, 1, int(seconds * 5) + 1) > 0.2, sr // 5)[:n]
+    return (x * gate * 0.3).astype(np.float32)
+
+
+def bench_reedit(seconds=180.0, cuts=(2.0, 2.01, 2.013, 0.737), max_asr_seconds=2.0, sr=16000):
+    """
+    --previous on a synthetic re-edit: `seconds` of audio with one cut of each length at 1/3 and
+    nothing else changed. Cuts that aren't a multiple of the 20 ms fingerprint hop must still map
+    to two regions with only the seam re-transcribed (regression when more than
+    `max_asr_seconds` of ASR or more than two regions).
+    """
+    import numpy as np
+    import audio_diff
+    old = speechlike_audio(seconds, sr=sr)
+    words = [{"text": "w%d" % i, "start": i * 0.5 + 0.05, "end": i * 0.5 + 0.4} for i in range(int(seconds * 2))]
+    t0 = time.perf_counter()
+    fp_old = audio_diff.fingerprint(old)
+    fp_seconds = time.perf_counter() - t0
+    at, runs, regressions = int(seconds / 3 * sr), [], []
+    for cut in cuts:
+        new = np.concatenate([old[:at], old[at + int(round(cut * sr)):]])
+        t0 = time.perf_counter()
+        matches, changed = audio_diff.align(fp_old, audio_diff.fingerprint(new))
+        kept, partial = audio_diff.remap_words(words, matches)
+        windows = audio_diff.retranscribe_windows(changed + partial, kept, len(new) / sr)
+        asr = sum(b - a for a, b in windows)
+        runs.append({"cut_seconds": cut, "regions": len(matches), "shifts": [m["shift"] for m in matches],
+                     "reused_words": len(kept), "windows": len(windows), "asr_seconds": asr,
+                     "seconds": time.perf_counter() - t0})
+        if len(matches) > 2 or asr > max_asr_seconds:
+            regressions.append({"stage": f"reedit cut {cut}s: {len(matches)} regions, {asr:.1f}s of ASR"})
+    return {"benchmark": "reedit", "audio_seconds": seconds, "fingerprint_seconds": fp_seconds,
+            "runs": runs, "regressions": regressions}
+
+
+HEAVY_MODULES = ("torch", "whisperx", "faster_whisper", "ctranslate2", "openai", "numpy")
+HERE = os.path.dirname(os.path.abspath(__file__))
+STARTUP_PROBES = {
+    "bahmanPi --help": ["bahmanPi.py", "--help"],
+    "asr_worker --help": ["asr_worker.py", "--help"],
+    "burn_video --help": ["burn_video.py", "--help"],
+    "captionize --help": ["captionize.py", "--help"],
+    "import editor": ["-c", "import editor"],
+}
+
+
+def bench_startup(budget_ms=500.0, repeat=5):
+    """
+    Wall time of fresh interpreters running each entry point's --help (and importing the editor
+    app), best of `repeat`. Also lists heavy modules any of them imports eagerly.
+    """
+    env = dict(os.environ)
+    env.pop("OPENAI_API_KEY", None)  # importing the editor must not need it
+    probes, regressions = {}, []
+    for name, argv in STARTUP_PROBES.items():
+        cmd = [sys.executable] + argv
+        best, err = None, None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            p = subprocess.run(cmd, cwd=HERE, env=env, capture_output=True, text=True)
+            dt = time.perf_counter() - t0
+            if p.returncode != 0:
+                err = (p.stderr.strip().splitlines() or ["exit %d" % p.returncode])[-1]
+                break
+            best = dt if best is None else min(best, dt)
+        if err:
+            # a missing optional dependency (e.g. flask) skips the probe instead of failing it
+            probes[name] = {"skipped": err}
+            continue
+        probes[name] = {"seconds": best}
+        if best * 1000 > budget_ms:
+            regressions.append({"stage": name, "baseline": budget_ms / 1000, "current": best,
+                                "ratio": best * 1000 / budget_ms})
+
+    check = ("import sys, json\n"
+             "for m in ('bahmanPi', 'asr_worker', 'burn_video', 'captionize', 'editor'):\n"
+             "    try: __import__(m)\n"
+             "    except ImportError: pass\n"
+             f"print(json.dumps(sorted(set({HEAVY_MODULES!r}) & set(sys.modules))))")
+    p = subprocess.run([sys.executable, "-c", check], cwd=HERE, env=env, capture_output=True, text=True)
+    heavy = json.loads(p.stdout.strip().splitlines()[-1]) if p.returncode == 0 else None
+    for m in heavy or []:
+        regressions.append({"stage": f"eager import of {m}"})
+    return {"benchmark": "startup", "budget_ms": budget_ms, "probes": probes,
+            "heavy_modules_at_import": heavy, "regressions": regressions}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Captionize pipeline benchmarks")
+    ap.add_argument("--json", dest="json_out", help="Also write results to this JSON file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("render", help="make_ass throughput on a synthetic transcript")
+    p.add_argument("--words", dest="words", type=int, default=200000, help="Synthetic transcript size")
+    p.add_argument("--repeat", dest="repeat", type=int, default=3, help="Best of N runs")
+
+    p = sub.add_parser("stages", help="Per-stage timings on synthetic audio with a fake ASR backend")
+    p.add_argument("--scales", dest="scales", default="60,600,7200", help="Comma-separated audio lengths in seconds")
+    p.add_argument("--wps", dest="wps", type=float, default=2.5, help="Fake ASR words per second of audio")
+    p.add_argument("--fake-rtf", dest="fake_rtf", type=float, default=0.0, help="Fake ASR compute time per audio second")
+    p.add_argument("--baseline", dest="baseline", help="Earlier stages JSON to compare against")
+    p.add_argument("--tolerance", dest="tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline")
+
+    p = sub.add_parser("startup", help="--help / app import latency of every entry point against a budget")
+    p.add_argument("--budget-ms", dest="budget_ms", type=float, default=500.0, help="Max wall time per probe")
+    p.add_argument("--repeat", dest="repeat", type=int, default=5, help="Best of N runs")
+
+    p = sub.add_parser("batched", help="Sequential vs batched faster-whisper transcription of one real input")
+    p.add_argument("--input", dest="input", required=True, help="Media file to transcribe")
+    p.add_argument("--model", dest="model", default="small", help="Whisper model size")
+    p.add_argument("--compute-type", dest="compute_type", default=None, help="CTranslate2 compute type")
+    p.add_argument("--batch-sizes", dest="batch_sizes", default="8,16", help="Comma-separated batch sizes")
+    p.add_argument("--seconds", dest="seconds", type=float, default=None, help="Only the first N seconds")
+    p.add_argument("--language", dest="language", default=None, help="Pin the language")
+    p.add_argument("--gpu", dest="gpu", action="store_true", help="Let the backend pick CUDA if available")
+
+    p = sub.add_parser("ass-fps", help="ffmpeg ass filter frames/s for each --karaoke-style")
+    p.add_argument("--seconds", dest="seconds", type=int, default=30, help="Length of the blank test video")
+    p.add_argument("--playres", dest="playres", default="1080x1920", help="Video size / PlayRes")
+    p.add_argument("--fps", dest="fps", type=int, default=30, help="Frame rate")
+    p.add_argument("--font", dest="font", default="Vazirmatn", help="Subtitle font")
+    p.add_argument("--repeat", dest="repeat", type=int, default=1, help="Best of N runs")
+
+    p = sub.add_parser("reedit", help="--previous region matching on synthetic cuts, including non-frame-aligned ones")
+    p.add_argument("--seconds", dest="seconds", type=float, default=180.0, help="Synthetic audio length")
+    p.add_argument("--cuts", dest="cuts", default="2.0,2.01,2.013,0.737", help="Comma-separated cut lengths in seconds")
+    p.add_argument("--max-asr-seconds", dest="max_asr_seconds", type=float, default=2.0,
+                   help="Fail when a single cut needs more re-transcription than this")
+    args = ap.parse_args()
+
+    if args.cmd == "render":
+        result = bench_render(args.words, repeat=args.repeat)
+        print(f"[i] {result['words']} words / {result['lines']} lines")
+        print(f"    reference: {result['reference_words_per_second']:,.0f} words/s")
+        print(f"    fast:      {result['fast_words_per_second']:,.0f} words/s  ({result['speedup']:.2f}x, byte-identical)")
+    elif args.cmd == "stages":
+        scales = [int(float(x)) for x in args.scales.split(",") if x.strip()]
+        result = bench_stages(scales, words_per_second=args.wps, rtf=args.fake_rtf)
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                result["regressions"] = compare_to_baseline(result, json.load(f), tolerance=args.tolerance)
+    elif args.cmd == "batched":
+        sizes = [int(x) for x in args.batch_sizes.split(",") if x.strip()]
+        result = bench_batched(args.input, model_name=args.model, compute_type=args.compute_type, batch_sizes=sizes,
+                               device_hint=None if args.gpu else "cpu", seconds=args.seconds, language=args.language)
+        print(f"[i] {result['audio_seconds']:.0f}s audio, {result['model']} on {result['device']} ({result['cpu_count']} CPUs)")
+        for r in result["runs"]:
+            label = "sequential" if not r["batch_size"] else f"batch {r['batch_size']}"
+            print(f"    {label:<12} {r['seconds']:8.1f}s  RTF {r['rtf']:.3f}  {r['words']} words  ({r['speedup']:.2f}x)")
+    elif args.cmd == "ass-fps":
+        w, h = map(int, args.playres.lower().split("x"))
+        result = bench_ass_fps(args.seconds, playres=(w, h), fps=args.fps, font=args.font, repeat=args.repeat)
+        print(f"[i] {result['frames']} frames, {result['lines']} lines / {result['words']} words")
+        for style, r in result["styles"].items():
+            print(f"    {style:<6} {r['fps']:8.1f} fps  ({r['speedup_vs_full']:.2f}x)")
+    elif args.cmd == "reedit":
+        cuts = [float(x) for x in args.cuts.split(",") if x.strip()]
+        result = bench_reedit(args.seconds, cuts=cuts, max_asr_seconds=args.max_asr_seconds)
+        print(f"[i] {result['audio_seconds']:.0f}s audio, fingerprint {result['fingerprint_seconds']:.2f}s")
+        for r in result["runs"]:
+            print(f"    cut {r['cut_seconds']:<7} {r['regions']} regions  {r['windows']} windows  "
+                  f"{r['asr_seconds']:5.2f}s ASR  shift {r['shifts'][-1]:.3f}s")
+    elif args.cmd == "startup":
+        result = bench_startup(budget_ms=args.budget_ms, repeat=args.repeat)
+        for name, r in result["probes"].items():
+            shown = f"{r['seconds'] * 1000:.0f} ms" if "seconds" in r else f"skipped ({r['skipped']})"
+            print(f"    {name:<20} {shown}")
+        print(f"[i] Heavy modules imported at startup: {result['heavy_modules_at_import'] or 'none'}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if result.get("regressions"):
+        for r in result["regressions"]:
+            if "current" not in r:
+                print(f"[!] Regression: {r['stage']}")
+                continue
+            where = f" at {r['scale_seconds']}s" if "scale_seconds" in r else ""
+            print(f"[!] Regression: {r['stage']}{where} "
+                  f"{r['baseline']:.3f}s -> {r['current']:.3f}s ({r['ratio']:.2f}x)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@
 
 import argparse, os, subprocess, sys
 
+# Use the working static FFmpeg build when it is there; CAPTIONIZE_FFMPEG overrides
+STATIC_FFMPEG = '/home/imanbahmani/ffmpeg-7.0.2-amd64-static/ffmpeg'
+
+def find_ffmpeg():
+    return os.environ.get("CAPTIONIZE_FFMPEG") or (STATIC_FFMPEG if os.path.exists(STATIC_FFMPEG) else "ffmpeg")
+
 def run(cmd, verbose=False):
     """اجرای دستور و بررسی خروجی"""
     if verbose:
@@ -49,7 +55,7 @@ def get_video_info(video_path):
 
 
 
-def burn_subtitles(video_path, ass_path, output_path, quality="high", verbose=False):
+def burn_subtitles(video_path, ass_path, output_path, quality="high", verbose=False, ffmpeg_bin=None):
     """اعمال زیرنویس روی ویدیو"""
     
     # تنظیمات کیفیت
@@ -77,8 +83,7 @@ def burn_subtitles(video_path, ass_path, output_path, quality="high", verbose=Fa
     }
     
     preset = quality_presets.get(quality, quality_presets["medium"])
-     #Use the working static FFmpeg build
-    ffmpeg_bin = '/home/imanbahmani/ffmpeg-7.0.2-amd64-static/ffmpeg'
+    ffmpeg_bin = ffmpeg_bin or find_ffmpeg()
     # ساخت دستور ffmpeg
     cmd = [
         ffmpeg_bin, "-y",
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+One-process captioning pipeline: transcribe -> correction rules -> ASS (+ sidecar / other
+formats) -> burn_video.burn_subtitles, built on bahmanPi.run_batch. The ASR model is loaded once
+and shared by every input, each input's video size becomes its PlayRes and its audio is decoded
+once in memory. Inputs run concurrently: while one file is being burned the next one is already
+transcribing.
+
+Run: python captionize.py --in-dir videos/ --out-dir subs/ --rules fixes.json --burn --quality instagram
+API: captionize(["a.mp4", "b.mp4"], model="small", rules={"غلط": "درست"}, burn=True)
+"""
+
+import argparse, copy, json, sys
+
+import bahmanPi
+
+
+def load_rules(path):
+    """
+    Word correction rules: a JSON object {"wrong": "right"}, or a text file with one
+    "wrong<TAB>right" pair per line (# comments allowed). An empty right side deletes the word.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if content.lstrip().startswith("{"):
+        return json.loads(content)
+    rules = {}
+    for ln in content.splitlines():
+        if not ln.strip() or ln.lstrip().startswith("#"):
+            continue
+        wrong, _, right = ln.partition("\t")
+        rules[wrong.strip()] = right.strip()
+    return rules
+
+
+def apply_rules(words, rules):
+    """Replace (or drop) words whose text exactly matches a rule; streams like the rest of the pipeline."""
+    for w in words:
+        fixed = rules.get(w["text"])
+        if fixed is None:
+            yield w
+        elif fixed:
+            yield dict(w, text=fixed)
+
+
+def file_args(inp, args):
+    """run_batch hook: PlayRes from the input's own video size unless --playres was given."""
+    if args.playres:
+        return args
+    info = bahmanPi.probe_media(inp)
+    args = copy.copy(args)
+    args.playres = f"{info['width']}x{info['height']}" if info["width"] else "1080x1920"
+    return args
+
+
+def burner(args):
+    """run_batch burn hook: burn_video.burn_subtitles with --quality, ffmpeg looked up once per batch."""
+    import burn_video
+    ffmpeg_bin = burn_video.find_ffmpeg()
+
+    def burn(rec):
+        burn_video.burn_subtitles(rec["input"], rec["ass"], rec["video"], quality=args.quality,
+                                  ffmpeg_bin=ffmpeg_bin)
+    return burn
+
+
+def run(inputs, args, rules=None):
+    """Caption (and with --burn, burn) every input through bahmanPi.run_batch; returns its report."""
+    rules = rules if rules is not None else (load_rules(args.rules) if args.rules else {})
+    word_filter = (lambda words: apply_rules(words, rules)) if rules else None
+    return bahmanPi.run_batch(inputs, args, word_filter=word_filter, file_args=file_args,
+                              burn=burner(args) if args.burn else None, burn_workers=args.burn_workers,
+                              report_name="captionize_report.json")
+
+
+def make_args(**options):
+    """bahmanPi/captionize defaults overridden by keyword options (Python API)."""
+    args = build_parser().parse_args([])
+    for key, value in options.items():
+        if not hasattr(args, key):
+            raise TypeError(f"Unknown captionize option: {key}")
+        setattr(args, key, value)
+    return args
+
+
+def captionize(inputs, rules=None, **options):
+    """
+    Python API: run the whole pipeline over `inputs` in this process and return the report dict.
+    `rules` is a {"wrong": "right"} dict (or pass rules="path" for a rules file); other keyword
+    options are the CLI's dest names, e.g. model="small", formats="ass,srt", burn=True.
+    """
+    if isinstance(rules, str):
+        rules = load_rules(rules)
+    args = make_args(**options)
+    import align_cache
+    align_cache.configure(model_dir=args.align_model_dir, max_bytes=args.align_cache_mb * 1024 * 1024)
+    return run(list(inputs), args, rules=rules)
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(description="Transcribe, correct, write ASS and burn in one process",
+                                 parents=[bahmanPi.build_parser(add_help=False)], conflict_handler="resolve")
+    ap.add_argument("--rules", dest="rules", default=None,
+                    help='Word correction rules: JSON {"wrong": "right"} or "wrong<TAB>right" lines')
+    ap.add_argument("--quality", dest="quality", default="medium", choices=["high", "medium", "low", "instagram"],
+                    help="burn_video quality preset for --burn")
+    ap.add_argument("--burn-workers", dest="burn_workers", type=int, default=1,
+                    help="Concurrent ffmpeg burns (run alongside transcription of later inputs)")
+    ap.add_argument("--playres", dest="playres", default=None,
+                    help="PlayResXxY (default: the video's own size, 1080x1920 for audio-only inputs)")
+    return ap
+
+
+def main():
+    ap = build_parser()
+    args = ap.parse_args()
+    if args.transcript or args.previous or args.start is not None or args.end is not None or args.profile:
+        ap.error("--transcript, --previous, --start/--end and --profile are bahmanPi.py single-file options")
+
+    import subtitle_writers
+    formats = subtitle_writers.parse_formats(args.formats)
+    if args.burn and "ass" not in formats:
+        ap.error("--burn needs ass in --formats")
+
+    inputs = ([args.inp] if args.inp else []) + bahmanPi.collect_inputs(args.in_dir, args.pattern, args.manifest)
+    inputs = list(dict.fromkeys(inputs))
+    if not inputs:
+        ap.error("one of --in, --in-dir/--glob or --manifest is required")
+    if args.rtf_target:
+        bahmanPi.tune_model(inputs[0], args)
+
+    import align_cache
+    align_cache.configure(model_dir=args.align_model_dir, max_bytes=args.align_cache_mb * 1024 * 1024)
+    report = run(inputs, args)
+    if report["failed"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
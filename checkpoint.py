@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON Lines checkpoint for long transcriptions.
+Line 1 is a header describing the job; every following line is one finished segment:
+{"end": <segment end, seconds>, "words": [{"text", "start", "end"}, ...]}
+A run killed mid-way (OOM, preemption, Ctrl-C) is resumed from the last complete line.
+"""
+
+import json, os
+
+
+class Checkpoint:
+    def __init__(self, path, job):
+        self.path = path
+        self.job = job  # anything that must match for a resume to be valid
+        self._f = None
+
+    def load(self):
+        """
+        Returns (header, words, resume_at) from a compatible checkpoint, or (None, [], 0.0).
+        A torn last line (process killed while writing) is ignored.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return None, [], 0.0
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return None, [], 0.0
+        if header.get("job") != self.job:
+            print(f"[!] Checkpoint {self.path} belongs to a different job; starting over")
+            return None, [], 0.0
+        words, resume_at = [], 0.0
+        for line in lines[1:]:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break
+            words.extend(rec["words"])
+            resume_at = max(resume_at, float(rec["end"]))
+        return header, words, resume_at
+
+    def start(self, language=None):
+        """Begin a fresh checkpoint file."""
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._f = open(self.path, "w", encoding="utf-8")
+        self._write({"job": self.job, "language": language})
+
+    def reopen(self):
+        """Keep appending to an existing checkpoint after a resume (drops a torn last line)."""
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if lines and not lines[-1].endswith("\n"):
+            lines = lines[:-1]
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        self._f = open(self.path, "a", encoding="utf-8")
+
+    def _write(self, rec):
+        self._f.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._f.flush()
+
+    def append(self, seg_end, words):
+        self._write({"end": seg_end, "words": words})
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -16,24 +16,29 @@ os.environ.pop('ALL_PROXY', None)
 os.environ.pop('all_proxy', None)
 
 import re
+import json
 from io import BytesIO
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
 
 app = Flask(__name__)
-# OpenAI API setup
-# load .env file
-load_dotenv()
-
-# read API key from environment
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("❌ OPENAI_API_KEY not found. Please set it in your .env file.")
+# OpenAI client is created on the first GPT request, so importing/starting the editor
+# needs neither the openai package nor an API key.
+openai_client = None
 
-# initialize client
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+def get_openai_client():
+    global openai_client
+    if openai_client is None:
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("❌ OPENAI_API_KEY not found. Please set it in your .env file.")
+        from openai import OpenAI
+        openai_client = OpenAI(api_key=api_key)
+    return openai_client
 CORRECTION_PROMPT = """شما یک دستیار تصحیح زیرنویس فارسی هستید. این متن‌ها زیرنویس‌های تولید شده توسط هوش مصنوعی از طریق تشخیص گفتار (Speech-to-Text) از ویدیوهای آموزشی و سخنرانی‌ها هستند.
 
 ماموریت شما: تصحیح اشتباهات سیستم تشخیص گفتار با استفاده از تحلیل معنایی، زمینه‌ای و آواشناسی.
@@ -812,7 +817,8 @@ HTML_TEMPLATE = """
         <div class="upload-area" id="uploadArea" onclick="document.getElementById('fileInput').click()">
             <div class="upload-icon">📤</div>
             <div class="upload-text">Click to upload ASS subtitle file</div>
-            <input type="file" id="fileInput" class="file-input" accept=".ass" onchange="uploadFile(this)">
+            <div class="line-count">Select the matching .words.jsonl (or .json) too, for exact word timings and confidences</div>
+            <input type="file" id="fileInput" class="file-input" accept=".ass,.json,.jsonl" multiple onchange="uploadFile(this)">
         </div>
         
         <div id="editorSection" class="hidden">
@@ -861,6 +867,10 @@ HTML_TEMPLATE = """
                     <span>🔄</span>
                     <span id="reverseLabel">Reverse Word Order</span>
                 </button>
+                <button class="reverse-toggle" id="uncertainToggle" onclick="togglePreviewUncertain()">
+                    <span>🎯</span>
+                    <span id="uncertainLabel">Only Uncertain Lines</span>
+                </button>
             </div>
             
             <div class="preview-list" id="previewList"></div>
@@ -943,6 +953,10 @@ HTML_TEMPLATE = """
         let isRTL = true; // Default to RTL for Arabic/Persian
         let previewReversed = false;
         let previewTexts = {};
+        let previewContext = {};
+        let previewUncertainOnly = false;
+        const UNCERTAIN_PROB = 0.6;  // a line is uncertain if any word's ASR confidence is below this
+        const CONTEXT_LINES = 1;     // neighbouring lines sent along (not corrected) for context
         let hardsubVideoFile = null;
         let hardsubQuality = 'medium';
         let hardsubReversed = false;
@@ -1109,11 +1123,17 @@ HTML_TEMPLATE = """
         }
         
         function uploadFile(input) {
-            const file = input.files[0];
+            const files = Array.from(input.files);
+            const isWords = f => /\.jsonl?$/i.test(f.name);
+            const file = files.find(f => !isWords(f));
             if (!file) return;
+            const wordsFile = files.find(isWords);
             
             const formData = new FormData();
             formData.append('file', file);
+            if (wordsFile) {
+                formData.append('words', wordsFile);
+            }
             
             fetch('/upload', {
                 method: 'POST',
@@ -1263,13 +1283,10 @@ HTML_TEMPLATE = """
             
             // Prepare preview data
             previewReversed = false;
-            previewTexts = {};
-            subtitles.forEach((sub, index) => {
-                previewTexts[index + 1] = extractVisibleText(sub.text);
-            });
-            
-            // Update modal
-            document.getElementById('previewCount').textContent = Object.keys(previewTexts).length;
+            const hasConfidence = subtitles.some(sub => sub.min_prob !== undefined && sub.min_prob !== null);
+            previewUncertainOnly = hasConfidence;
+            document.getElementById('uncertainToggle').style.display = hasConfidence ? '' : 'none';
+            buildPreviewTexts();
             document.getElementById('reverseLabel').textContent = 'Reverse Word Order';
             
             // Render preview
@@ -1279,6 +1296,35 @@ HTML_TEMPLATE = """
             document.getElementById('gptModal').classList.add('active');
         }
         
+        function buildPreviewTexts() {
+            // With confidences loaded, only lines holding a low-confidence word are corrected;
+            // CONTEXT_LINES neighbours on each side go along as read-only context
+            previewTexts = {};
+            previewContext = {};
+            const uncertain = subtitles.map(sub => sub.min_prob !== undefined && sub.min_prob !== null && sub.min_prob < UNCERTAIN_PROB);
+            subtitles.forEach((sub, index) => {
+                const text = extractVisibleText(sub.text);
+                if (!previewUncertainOnly || uncertain[index]) {
+                    previewTexts[index + 1] = text;
+                    return;
+                }
+                for (let d = 1; d <= CONTEXT_LINES; d++) {
+                    if (uncertain[index - d] || uncertain[index + d]) {
+                        previewContext[index + 1] = text;
+                        return;
+                    }
+                }
+            });
+            document.getElementById('previewCount').textContent = Object.keys(previewTexts).length;
+            document.getElementById('uncertainLabel').textContent = previewUncertainOnly ? 'Send All Lines' : 'Only Uncertain Lines';
+        }
+        
+        function togglePreviewUncertain() {
+            previewUncertainOnly = !previewUncertainOnly;
+            buildPreviewTexts();
+            renderPreview();
+        }
+        
         function closeGPTPreview() {
             document.getElementById('gptModal').classList.remove('active');
         }
@@ -1323,6 +1369,10 @@ HTML_TEMPLATE = """
                 }
                 finalTexts[key] = text;
             });
+            const finalContext = {};
+            Object.keys(previewContext).forEach(key => {
+                finalContext[key] = previewReversed ? reverseWords(previewContext[key]) : previewContext[key];
+            });
             
             console.log('📤 Sending to GPT:', finalTexts);
             
@@ -1337,7 +1387,7 @@ HTML_TEMPLATE = """
             fetch('/gpt_correct', {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({texts: finalTexts})
+                body: JSON.stringify({texts: finalTexts, context: finalContext})
             })
             .then(response => response.json())
             .then(data => {
@@ -1475,8 +1525,62 @@ def extract_visible_text(text):
     
     return cleaned
 
-def update_dialogue_text(dialogue, new_text, reverse_words=False):
-    """Uses exact same styling as original generator"""
+# karaoke tags per style, as written by bahmanPi.py --karaoke-style
+FULL_KARAOKE = (r",\c&H00FFFF&\3c&H000000&\bord5\b1\fscx125\fscy125)}",
+                r",\c&HFFFFFF&\3c&H000000&\bord4\b0\fscx100\fscy100)}")
+LIGHT_KARAOKE = (r",\c&H00FFFF&)}", r",\c&HFFFFFF&)}")
+
+def karaoke_token(word, start_ms, end_ms, light=False):
+    """One RTL karaoke word: highlight from start_ms to end_ms, reset right after"""
+    on, off = LIGHT_KARAOKE if light else FULL_KARAOKE
+    return (r"{\t(" + str(start_ms) + "," + str(end_ms) + on + word +
+            r"{\t(" + str(end_ms) + "," + str(end_ms + 1) + off)
+
+def update_dialogue_from_words(dialogue, new_text):
+    """
+    Re-time an edited line from its exact sidecar word timings and rebuild it with the
+    generator itself (bahmanPi.make_ass_line), so RTL and LTR lines both keep their karaoke.
+    `new_text` is in ASS order, i.e. reversed for RTL lines.
+    """
+    import bahmanPi
+    old = dialogue['words']
+    new_words = re.sub('[\u200e\u200f\u202a-\u202e]', '', new_text).split()  # bidi marks, not ZWNJ
+    if not new_words:
+        dialogue['text'] = ''
+        dialogue['words'] = []
+        return dialogue
+    if is_rtl_text(new_text):
+        new_words = new_words[::-1]  # back to spoken order
+    
+    if len(new_words) == len(old):
+        words = [{'text': t, 'start': w['start'], 'end': w['end']} for t, w in zip(new_words, old)]
+    else:
+        # spread the line's spoken span over the new words by character count
+        start, end = old[0]['start'], old[-1]['end']
+        weights = [max(1, len(t)) for t in new_words]
+        total = sum(weights)
+        words, t = [], start
+        for text, weight in zip(new_words, weights):
+            dur = (end - start) * weight / total
+            words.append({'text': text, 'start': t, 'end': t + dur})
+            t += dur
+    
+    original = dialogue['text']
+    light = r'\kf' in original or (r'\t(' in original and r'\fscx125' not in original)
+    line = bahmanPi.make_ass_line({'words': words}, karaoke='light' if light else 'full')
+    if line is None:
+        dialogue['text'] = ''
+        dialogue['words'] = []
+        return dialogue
+    parts = line.split(',', 9)
+    dialogue['start'], dialogue['end'], dialogue['text'] = parts[1], parts[2], parts[9]
+    dialogue['words'] = words
+    return dialogue
+
+def update_dialogue_text(dialogue, new_text, reverse_words=False, light=None):
+    """Uses exact same styling as original generator (light=None keeps the line's own karaoke style)"""
+    if dialogue.get('words'):
+        return update_dialogue_from_words(dialogue, new_text)
     original = dialogue['text']
     
     # Parse new words
@@ -1488,6 +1592,8 @@ def update_dialogue_text(dialogue, new_text, reverse_words=False):
     
     # Check if original has karaoke timing
     has_karaoke = r'\t(' in original
+    if light is None:
+        light = has_karaoke and r'\fscx125' not in original
     
     if has_karaoke:
         # Extract ALL original timings
@@ -1540,12 +1646,7 @@ def update_dialogue_text(dialogue, new_text, reverse_words=False):
                     print(f"  Word '{word}': {start_ms}ms -> {end_ms}ms (duration: {end_ms-start_ms}ms)")
                     
                     # Use EXACT original styling
-                    kao_tokens.append(
-                        r"{\t(" + str(start_ms) + "," + str(end_ms) + 
-                        r",\c&H00FFFF&\3c&H000000&\bord5\b1\fscx125\fscy125)}" + word + 
-                        r"{\t(" + str(end_ms) + "," + str(end_ms+1) + 
-                        r",\c&HFFFFFF&\3c&H000000&\bord4\b0\fscx100\fscy100)}"
-                    )
+                    kao_tokens.append(karaoke_token(word, start_ms, end_ms, light))
             
             # CASE 2: Word count DIFFERENT - distribute timing naturally
             else:
@@ -1579,12 +1680,7 @@ def update_dialogue_text(dialogue, new_text, reverse_words=False):
                     print(f"  Highlight start: {start_ms}ms, end: {end_ms}ms")
                     
                     word = fix_punct(new_words[0].strip())
-                    kao_tokens.append(
-                        r"{\t(" + str(start_ms) + "," + str(end_ms) + 
-                        r",\c&H00FFFF&\3c&H000000&\bord5\b1\fscx125\fscy125)}" + word + 
-                        r"{\t(" + str(end_ms) + "," + str(end_ms+1) + 
-                        r",\c&HFFFFFF&\3c&H000000&\bord4\b0\fscx100\fscy100)}"
-                    )
+                    kao_tokens.append(karaoke_token(word, start_ms, end_ms, light))
                 else:
                     # Multiple words - distribute proportionally, each word highlights in sequence
                     print(f"MULTIPLE WORDS MODE: Sequential highlighting starting from 0")
@@ -1637,12 +1733,7 @@ def update_dialogue_text(dialogue, new_text, reverse_words=False):
                         print(f"  Visual pos {visual_position}, Word '{word}' (index {i}): {start_ms}ms -> {end_ms}ms")
                         
                         # Use EXACT same styling as make_ass and Case 1
-                        kao_tokens.append(
-                            r"{\t(" + str(start_ms) + "," + str(end_ms) + 
-                            r",\c&H00FFFF&\3c&H000000&\bord5\b1\fscx125\fscy125)}" + word + 
-                            r"{\t(" + str(end_ms) + "," + str(end_ms+1) + 
-                            r",\c&HFFFFFF&\3c&H000000&\bord4\b0\fscx100\fscy100)}"
-                        )
+                        kao_tokens.append(karaoke_token(word, start_ms, end_ms, light))
             
             dialogue['text'] = r"{\an2\q2}" + " ".join(kao_tokens)
             print(f"=== END DEBUG ===\n")
@@ -1654,6 +1745,34 @@ def update_dialogue_text(dialogue, new_text, reverse_words=False):
     return dialogue
 
 
+def parse_word_sidecar(content):
+    """
+    Per-line word lists {line index: [{"text", "start", "end", "prob"?}, ...]} from bahmanPi.py's
+    <stem>.words.jsonl sidecar (one record per Dialogue line) or its --formats json word array.
+    """
+    content = content.strip()
+    line_words = {}
+    if content.startswith('['):
+        for w in json.loads(content):
+            if w.get('line') is not None:
+                line_words.setdefault(w['line'], []).append({k: v for k, v in w.items() if k != 'line'})
+    else:
+        for row in content.splitlines():
+            if row.strip():
+                rec = json.loads(row)
+                line_words[rec['line']] = rec['words']
+    return line_words
+
+def attach_words(dialogues, line_words):
+    """Exact word timings as dialogue['words'] plus the line's minimum ASR confidence as dialogue['min_prob']"""
+    for i, words in line_words.items():
+        if 0 <= i < len(dialogues) and words:
+            d = dialogues[i]
+            d['words'] = words
+            probs = [w['prob'] for w in words if w.get('prob') is not None]
+            d['min_prob'] = min(probs) if probs else None
+    return dialogues
+
 def build_dialogue_line(dialogue):
     """Build dialogue line for ASS file"""
     return f"Dialogue: {dialogue['layer']},{dialogue['start']},{dialogue['end']},{dialogue['style']},{dialogue['name']},{dialogue['marginL']},{dialogue['marginR']},{dialogue['marginV']},{dialogue['effect']},{dialogue['text']}"
@@ -1671,6 +1790,17 @@ def upload():
     content = file.read().decode('utf-8')
     header, dialogues = parse_ass(content)
     
+    words_file = request.files.get('words')
+    if words_file:
+        try:
+            line_words = parse_word_sidecar(words_file.read().decode('utf-8'))
+            if line_words and max(line_words) + 1 != len(dialogues):
+                print(f"⚠️ Ignoring {words_file.filename}: {max(line_words) + 1} lines vs {len(dialogues)} in the ASS")
+            else:
+                attach_words(dialogues, line_words)
+        except (ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring word timing file {words_file.filename}: {e}")
+    
     subtitles_data['header'] = header
     subtitles_data['dialogues'] = dialogues
     subtitles_data['filename'] = file.filename
@@ -1693,6 +1823,7 @@ def update():
     
     dialogue = subtitles_data['dialogues'][index]
     update_dialogue_text(dialogue, new_text, reverse_words=reverse_words)
+    dialogue['min_prob'] = None  # edited text is no longer the ASR guess
     
     return jsonify({
         'success': True,
@@ -1738,21 +1869,30 @@ def gpt_correct():
     try:
         data = request.json
         texts = data.get('texts', {})
+        context = data.get('context', {})
         
         print(f"\n{'='*60}")
         print(f"🤖 GPT CORRECTION REQUEST")
         print(f"{'='*60}")
-        print(f"📊 Total lines to correct: {len(texts)}")
+        print(f"📊 Total lines to correct: {len(texts)} (+{len(context)} context lines)")
         print(f"📝 Input data: {texts}")
         
+        if not texts:
+            return jsonify({'success': True, 'corrected_texts': {}})
+        
         # Prepare prompt with JSON data
         user_message = f"Correct the following Persian/Arabic subtitle texts:\n\n{texts}"
+        if context:
+            # plain numbered lines, not a second dict, so GPT has nothing to echo back as JSON
+            numbered = "\n".join(f"{k}. {context[k]}" for k in sorted(context, key=int))
+            user_message += ("\n\nNeighbouring lines, for context only. Do NOT correct them "
+                             f"or include them in your answer:\n\n{numbered}")
         
         print(f"\n📤 Sending to GPT-4...")
         print(f"💬 Prompt length: {len(user_message)} chars")
         
         # Call OpenAI API
-        response = openai_client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": CORRECTION_PROMPT},
@@ -1785,6 +1925,8 @@ def gpt_correct():
                 corrected_texts = json.loads(json_str)
             else:
                 corrected_texts = json.loads(reply)
+            # only the requested lines may change; anything else (e.g. an echoed context line) is dropped
+            corrected_texts = {k: v for k, v in corrected_texts.items() if k in texts}
             
             print(f"\n✅ Parsed corrected texts: {corrected_texts}")
             print(f"{'='*60}\n")
@@ -1809,12 +1951,12 @@ def gpt_correct():
             'success': False,
             'error': str(e)
         })
-import tempfile
-import shutil
-import burn_video
 @app.route('/hardsub', methods=['POST'])
 def hardsub():
     """Apply subtitles to video"""
+    import tempfile
+    import shutil
+    import burn_video
     try:
         video_file = request.files.get('video')
         quality = request.form.get('quality', 'medium')
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pick the most accurate Whisper model size / compute type that meets a real-time-factor target.
+RTF = transcription seconds / audio seconds (0.5 means twice as fast as real time).
+Measurements are cached per host (and batch size) in ~/.cache/captionize/tuner.json, so each
+(model, compute type) is only benchmarked once on a machine. Failed measurements are not cached.
+"""
+
+import importlib.util, json, os, platform, socket, time
+
+import bahmanPi
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "captionize", "tuner.json")
+# bump when the measurement changes, so RTFs taken the old way are measured again
+MEASURE_VERSION = 2
+
+# most accurate first
+MODELS = ["large-v3", "medium", "small", "base", "tiny"]
+COMPUTE_TYPES = {
+    "cuda": ["float16", "int8_float16", "int8"],
+    "cpu": ["float32", "int8"],
+}
+
+
+def host_key(device, backend, batch_size=0):
+    key = f"{socket.gethostname()}|{platform.machine()}|{os.cpu_count()}|{device}|{backend}|v{MEASURE_VERSION}"
+    return key + (f"|b{batch_size}" if batch_size else "")
+
+
+def _load_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp, path)
+
+
+def measure_rtf(sample, sample_seconds, model_name, compute_type, prefer_whisperx=True, device_hint=None,
+                language=None, warmup_seconds=5.0, batch_size=0):
+    """
+    Load one configuration (with the `batch_size` the real run uses) and time it on `sample`. Only steady-state transcription is counted:
+    model load, the WhisperX alignment model load (preloaded for `language`) and first-call setup
+    (a short warm-up run) are not, and a pinned `language` skips per-run detection.
+    """
+    asr = bahmanPi.load_asr(prefer_whisperx=prefer_whisperx, device_hint=device_hint,
+                            model_name=model_name, compute_type=compute_type, batch_size=batch_size)
+    if asr["backend"] == "whisperx" and language:
+        import align_cache
+        align_cache.preload([language], asr["device"])
+    bahmanPi.transcribe_word_timestamps(sample[:int(warmup_seconds * 16000)], asr=asr, language=language)
+    t0 = time.time()
+    bahmanPi.transcribe_word_timestamps(sample, asr=asr, language=language)
+    return (time.time() - t0) / sample_seconds
+
+
+def pick_config(src, rtf_target, prefer_whisperx=True, device_hint=None,
+                sample_seconds=30.0, cache_path=CACHE_PATH, language=None, batch_size=0):
+    """
+    Returns (model_name, compute_type): the first candidate in accuracy order whose measured
+    RTF is <= rtf_target. Candidates already measured on this host are not re-run; the
+    sample from `src` is only decoded if something still has to be measured. A candidate that
+    fails to load or run (download error, out of memory) is skipped for this call only.
+    Falls back to the fastest candidate if none meets the target.
+    Without `language` it is detected once on the sample, outside the timed runs.
+    """
+    device = bahmanPi.pick_device(device_hint)
+    # find_spec instead of importing whisperx (and torch) just to build the cache key
+    backend = "whisperx" if prefer_whisperx and importlib.util.find_spec("whisperx") else "faster-whisper"
+    key = host_key(device, backend, batch_size)
+    cache = _load_cache(cache_path)
+    measured = cache.setdefault(key, {})
+
+    candidates = [(m, c) for m in MODELS for c in COMPUTE_TYPES.get(device, COMPUTE_TYPES["cpu"])]
+    sample = None
+    for model_name, compute_type in candidates:
+        name = f"{model_name}/{compute_type}"
+        if measured.get(name) is None:  # None: a failure cached by older versions, retried
+            if sample is None:
+                duration = bahmanPi.probe_duration(src) or 0
+                start = max(0.0, min(duration * 0.1, duration - sample_seconds))
+                print(f"[i] Benchmarking models on a {sample_seconds:.0f}s sample (once per host)…")
+                sample = bahmanPi.decode_audio(src, start=start, duration=sample_seconds)
+                sample_len = len(sample) / 16000
+                if sample_len <= 0:
+                    raise SystemExit(f"Could not decode a benchmark sample from {src}")
+                if not language:
+                    language = bahmanPi.detect_language(sample, device_hint=device_hint)
+            try:
+                rtf = measure_rtf(sample, sample_len, model_name, compute_type, prefer_whisperx=prefer_whisperx,
+                                  device_hint=device_hint, language=language, batch_size=batch_size)
+            except Exception as e:
+                print(f"[!] {name} unavailable, skipped this time: {e}")
+                continue
+            measured[name] = rtf
+            _save_cache(cache, cache_path)
+            print(f"[i]   {name}: RTF {rtf:.3f}")
+        rtf = measured[name]
+        if rtf <= rtf_target:
+            print(f"[i] Auto-tuned: {name} (RTF {rtf:.3f} <= {rtf_target})")
+            return model_name, compute_type
+
+    model_name, compute_type = candidates[-1]
+    print(f"[!] No configuration meets RTF {rtf_target}; using the fastest: {model_name}/{compute_type}")
+    return model_name, compute_type
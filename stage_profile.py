@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-stage wall time, CPU time and peak RSS for a captioning job (bahmanPi.py --profile out.json).
+Stages nest: time spent in an inner stage is not counted again in the outer one, which keeps
+the numbers meaningful for the streaming pipeline where transcription, chunking and ASS
+writing interleave. Memory is charged the same way: a stage's "peak_rss_added_mb" is how far it
+pushed the process's peak RSS (ru_maxrss) up while it ran, so the stages that set the peak are
+the ones with non-zero values; the process-wide peak is the report's top-level "peak_rss_mb".
+One stage can additionally be recorded with cProfile.
+"""
+
+import cProfile, json, os, sys, time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_mb(who=None):
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _cpu_seconds():
+    t = time.process_time()
+    if resource is not None:
+        ru = resource.getrusage(resource.RUSAGE_CHILDREN)  # ffmpeg subprocesses, once reaped
+        t += ru.ru_utime + ru.ru_stime
+    return t
+
+
+class StageProfiler:
+    def __init__(self, cprofile_stage=None, cprofile_path=None):
+        self.stages = {}
+        self.order = []
+        self._stack = []  # [name, wall_start, cpu_start, peak_rss_start]
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_path = cprofile_path
+        self._cprofile = cProfile.Profile() if cprofile_stage and cprofile_path else None
+        self.started = time.perf_counter()
+        self.cpu_started = _cpu_seconds()
+
+    def _rec(self, name):
+        if name not in self.stages:
+            self.stages[name] = {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0, "peak_rss_added_mb": 0.0}
+            self.order.append(name)
+        return self.stages[name]
+
+    def _charge(self, frame, wall, cpu, rss):
+        rec = self._rec(frame[0])
+        rec["wall_seconds"] += wall - frame[1]
+        rec["cpu_seconds"] += cpu - frame[2]
+        if rss is not None:
+            rec["peak_rss_added_mb"] += rss - frame[3]
+
+    def _enter(self, name):
+        wall, cpu, rss = time.perf_counter(), _cpu_seconds(), _peak_rss_mb()
+        if self._stack:
+            self._charge(self._stack[-1], wall, cpu, rss)
+        self._stack.append([name, wall, cpu, rss])
+        if self._cprofile and name == self.cprofile_stage:
+            self._cprofile.enable()
+
+    def _exit(self):
+        frame = self._stack.pop()
+        if self._cprofile and frame[0] == self.cprofile_stage:
+            self._cprofile.disable()
+        wall, cpu, rss = time.perf_counter(), _cpu_seconds(), _peak_rss_mb()
+        self._charge(frame, wall, cpu, rss)
+        self._rec(frame[0])["calls"] += 1
+        if self._stack:
+            self._stack[-1][1], self._stack[-1][2], self._stack[-1][3] = wall, cpu, rss
+
+    def move_cpu(self, src, dst, seconds):
+        """Re-charge CPU time measured inside stage `src` to `dst` (e.g. a background thread's share)."""
+        self._rec(src)["cpu_seconds"] -= seconds
+        self._rec(dst)["cpu_seconds"] += seconds
+
+    @contextmanager
+    def stage(self, name):
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def wrap_iter(self, name, iterable):
+        """Charge the time spent producing each item of `iterable` to stage `name`."""
+        it = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            yield item
+
+    def report(self, audio_seconds=None, extra=None):
+        wall = time.perf_counter() - self.started
+        out = {
+            "wall_seconds": wall,
+            "cpu_seconds": _cpu_seconds() - self.cpu_started,
+            "peak_rss_mb": _peak_rss_mb(),
+            "children_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+            "audio_seconds": audio_seconds,
+            "rtf": (wall / audio_seconds) if audio_seconds else None,
+            "stages": {name: self.stages[name] for name in self.order},
+        }
+        asr = self.stages.get("transcribe")
+        if asr and audio_seconds:
+            out["transcribe_rtf"] = asr["wall_seconds"] / audio_seconds
+        if self._cprofile:
+            out["cprofile"] = {"stage": self.cprofile_stage, "path": self.cprofile_path}
+        out.update(extra or {})
+        return out
+
+    def dump(self, path, audio_seconds=None, extra=None):
+        report = self.report(audio_seconds=audio_seconds, extra=extra)
+        if self._cprofile:
+            self._cprofile.dump_stats(self.cprofile_path)
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
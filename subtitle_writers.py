@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming subtitle writers for bahmanPi.py --formats ass,srt,vtt,json.
+All writers consume the same readable lines ({"start", "end", "words": [...]}) one at a time
+and append to their file immediately, so one transcription feeds every format without
+building any output in memory.
+"""
+
+import json, os
+
+FORMATS = ("ass", "srt", "vtt", "json")
+
+
+def fmt_srt_ts(t, sep=","):
+    ms = int(round(max(0.0, t) * 1000))
+    s, ms = divmod(ms, 1000)
+    return "%02d:%02d:%02d%s%03d" % (s // 3600, s % 3600 // 60, s % 60, sep, ms)
+
+
+def line_text(ln):
+    # plain text in logical (spoken) order; players do their own bidi for SRT/VTT
+    words = ln["words"]
+    texts = words.texts() if hasattr(words, "texts") else (w.get("text") or "" for w in words)
+    return " ".join(t for t in (t.strip() for t in texts) if t)
+
+
+class _Writer:
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "w", encoding="utf-8")
+        self.count = 0
+
+    def write_line(self, ln):
+        raise NotImplementedError
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+
+class AssWriter(_Writer):
+    """`render(ln, style)` is bahmanPi.make_ass_line; the header is written up front."""
+    def __init__(self, path, header, render, style="Caption"):
+        super().__init__(path)
+        self.render, self.style = render, style
+        self.f.write(header)
+
+    def write_line(self, ln):
+        dialogue = self.render(ln, style=self.style)
+        if dialogue is None:
+            return False
+        self.f.write(dialogue + "\n")
+        self.count += 1
+        return True
+
+
+class SrtWriter(_Writer):
+    def write_line(self, ln):
+        text = line_text(ln)
+        if not text:
+            return False
+        self.count += 1
+        self.f.write("%d\n%s --> %s\n%s\n\n" % (self.count, fmt_srt_ts(ln["start"]), fmt_srt_ts(ln["end"]), text))
+        return True
+
+
+class VttWriter(_Writer):
+    def __init__(self, path):
+        super().__init__(path)
+        self.f.write("WEBVTT\n\n")
+
+    def write_line(self, ln):
+        text = line_text(ln)
+        if not text:
+            return False
+        self.count += 1
+        self.f.write("%s --> %s\n%s\n\n" % (fmt_srt_ts(ln["start"], "."), fmt_srt_ts(ln["end"], "."), text))
+        return True
+
+
+class JsonWriter(_Writer):
+    """A JSON array of every word dict plus its "line" index, written one word at a time."""
+    def __init__(self, path):
+        super().__init__(path)
+        self.f.write("[")
+        self.words = 0
+
+    def write_line(self, ln):
+        words = [w for w in ln["words"] if (w.get("text") or "").strip()]
+        if not words:
+            return False
+        for w in words:
+            rec = dict(w, line=self.count)
+            self.f.write(("\n" if not self.words else ",\n") + json.dumps(rec, ensure_ascii=False))
+            self.words += 1
+        self.count += 1
+        return True
+
+    def close(self):
+        if self.f:
+            self.f.write("\n]\n")
+        super().close()
+
+
+class WordSidecarWriter(_Writer):
+    """
+    <stem>.words.jsonl next to the ASS: one record per Dialogue line, in file order,
+    {"line": i, "start", "end", "words": [{"text", "start", "end", "prob"?}, ...]} with absolute
+    seconds, so the editor re-times edits from exact data instead of parsing karaoke tags.
+    Lines are skipped exactly when the ASS writer skips them, keeping "line" == Dialogue index.
+    """
+    def write_line(self, ln):
+        words = [w for w in ln["words"] if (w.get("text") or "").strip()]
+        if not words:
+            return False
+        self.f.write(json.dumps(sidecar_record(self.count, words), ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+        return True
+
+
+def sidecar_record(index, words):
+    return {"line": index, "start": words[0]["start"], "end": words[-1]["end"],
+            "words": [dict(w, text=w["text"].strip()) for w in words]}
+
+
+def sidecar_path(ass_path):
+    return os.path.splitext(ass_path)[0] + ".words.jsonl"
+
+
+def read_sidecar(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(ln) for ln in f if ln.strip()]
+
+
+def read_word_list(path):
+    """Flat word list from a .words.jsonl sidecar or a --formats json file, in time order."""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if content.lstrip().startswith("["):
+        words = [{k: v for k, v in w.items() if k != "line"} for w in json.loads(content)]
+    else:
+        words = [w for ln in content.splitlines() if ln.strip() for w in json.loads(ln)["words"]]
+    return sorted(words, key=lambda w: w["start"])
+
+
+def write_sidecar(path, records):
+    """Rewrite a whole sidecar (renumbering "line"), e.g. after bahmanPi.py --start/--end patched the ASS."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for i, rec in enumerate(records):
+            f.write(json.dumps(dict(rec, line=i), ensure_ascii=False, separators=(",", ":")) + "\n")
+    os.replace(tmp, path)
+
+
+def parse_formats(spec):
+    fmts = [s.strip().lower() for s in (spec or "ass").split(",") if s.strip()]
+    bad = [s for s in fmts if s not in FORMATS]
+    if bad or not fmts:
+        raise SystemExit(f"Unknown --formats {','.join(bad) or spec!r}; choose from {','.join(FORMATS)}")
+    return list(dict.fromkeys(fmts))
+
+
+def open_writers(ass_path, formats, ass_header=None, render=None, sidecar=True):
+    """
+    One writer per format, in the order given: the ASS at `ass_path` exactly as given (plus the word
+    sidecar), every other format at <ass_path stem>.<ext>.
+    """
+    stem = os.path.splitext(ass_path)[0]
+    for fmt in formats:
+        if fmt != "ass" and f"{stem}.{fmt}" == ass_path:
+            raise SystemExit(f"--ass {ass_path} would be overwritten by the {fmt} output")
+    writers = []
+    for fmt in formats:
+        path = f"{stem}.{fmt}"
+        if fmt == "ass":
+            writers.append(AssWriter(ass_path, ass_header, render))
+            if sidecar:
+                writers.append(WordSidecarWriter(sidecar_path(ass_path)))
+        elif fmt == "srt":
+            writers.append(SrtWriter(path))
+        elif fmt == "vtt":
+            writers.append(VttWriter(path))
+        else:
+            writers.append(JsonWriter(path))
+    return writers
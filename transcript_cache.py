@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed on-disk cache for word-timestamp lists.
+Key = sha256(input media bytes) + ASR options, so layout-only reruns (--gap, --maxwords,
+--font, --fontsize) skip both ffmpeg decoding and transcription.
+Entries are columnar word_store.WordTable .npz files (no per-word JSON objects to parse or
+build); the least recently used ones are evicted above the size cap.
+"""
+
+import hashlib, json, os, tempfile
+
+ENTRY_EXT = ".npz"
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "CAPTIONIZE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "captionize", "words"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_digest(path, block=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(src, **options):
+    """Hash of the input media content plus the ASR options that change the transcript."""
+    h = hashlib.sha256(file_digest(src).encode("ascii"))
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key + ENTRY_EXT)
+
+
+def load(key, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the cached WordTable, or None on a miss. A hit refreshes the entry's LRU position."""
+    from word_store import WordTable
+    path = _entry_path(key, cache_dir)
+    try:
+        words = WordTable.load(path)
+        os.utime(path, None)
+        return words
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def store(key, words, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """`words` is a WordTable (or an iterable of word dicts, converted first)."""
+    from word_store import WordTable
+    if not isinstance(words, WordTable):
+        words = WordTable.from_words(words)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        words.save(f)
+    os.replace(tmp, _entry_path(key, cache_dir))
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Delete least recently used entries until the cache fits in max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith((ENTRY_EXT, ".json")):  # .json: entries of older versions
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar word-timing store for long transcripts.
+start/end are float64 arrays; text is one UTF-8 buffer plus an int64 offsets array
+(word i is buffer[offsets[i]:offsets[i+1]]) and an optional float32 confidence column
+(NaN where the backend gave none), so a multi-hour transcript costs a few
+arrays instead of hundreds of thousands of dicts. WordTableBuilder fills the columns as words
+stream in, tables are saved and loaded as .npz (the transcription cache), line chunking runs
+vectorized and lines are index ranges (WordRange). The {"text", "start", "end"} dict API is still
+available per word.
+"""
+
+from array import array
+
+import numpy as np
+
+
+class WordTable:
+    __slots__ = ("start", "end", "offsets", "buffer", "prob")
+
+    def __init__(self, start, end, offsets, buffer, prob=None):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.buffer = bytes(buffer)
+        self.prob = (np.full(len(self.start), np.nan, dtype=np.float32) if prob is None
+                     else np.asarray(prob, dtype=np.float32))
+
+    @classmethod
+    def from_words(cls, words):
+        """Build from any iterable of word dicts (e.g. a streaming generator) without keeping the dicts."""
+        builder = WordTableBuilder()
+        for w in words:
+            builder.append(w)
+        return builder.table()
+
+    def save(self, f):
+        """Write the columns to `f` (a path or binary file) as an uncompressed .npz."""
+        np.savez(f, start=self.start, end=self.end, offsets=self.offsets, prob=self.prob,
+                 buffer=np.frombuffer(self.buffer, dtype=np.uint8))
+
+    @classmethod
+    def load(cls, f):
+        with np.load(f) as z:
+            return cls(z["start"], z["end"], z["offsets"], z["buffer"].tobytes(), z["prob"])
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def nbytes(self):
+        return self.start.nbytes + self.end.nbytes + self.offsets.nbytes + self.prob.nbytes + len(self.buffer)
+
+    def text(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def texts(self):
+        """Every word's text, read straight from the buffer (no word dicts)."""
+        buf, o = self.buffer, self.offsets.tolist()
+        return [buf[a:b].decode("utf-8") for a, b in zip(o[:-1], o[1:])]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            a, b, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("WordTable slices must be contiguous")
+            base = self.offsets[a]
+            return WordTable(self.start[a:b], self.end[a:b], self.offsets[a:b + 1] - base,
+                             self.buffer[base:self.offsets[b]], self.prob[a:b])
+        if i < 0:
+            i += len(self)
+        w = {"text": self.text(i), "start": float(self.start[i]), "end": float(self.end[i])}
+        p = self.prob[i]
+        if p == p:  # not NaN
+            w["prob"] = round(float(p), 3)
+        return w
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_words(self):
+        return list(self)
+
+    def line_breaks(self, max_gap=0.60, max_words=8):
+        """
+        Indices where a new readable line starts (always includes 0), identical to the
+        sequential rule in chunk_words_into_readable_lines: break when the gap to the previous
+        word exceeds max_gap, or when the current line already holds max_words words.
+        """
+        n = len(self)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        max_words = max(1, int(max_words))
+        gap_break = np.empty(n, dtype=bool)
+        gap_break[0] = True
+        gap_break[1:] = (self.start[1:] - self.end[:-1]) > max_gap
+        # word count restarts at every gap break, so within a gap run lines are max_words long
+        idx = np.arange(n, dtype=np.int64)
+        run_start = np.maximum.accumulate(np.where(gap_break, idx, 0))
+        return np.flatnonzero(gap_break | ((idx - run_start) % max_words == 0))
+
+    def columns(self):
+        """(texts, starts, ends) as plain lists."""
+        return self.texts(), self.start.tolist(), self.end.tolist()
+
+    def iter_lines(self, max_gap=0.60, max_words=8, block=4096):
+        """
+        Yields line dicts {"start", "end", "words"} one at a time; "words" is a WordRange over the
+        line's index range, so no per-word dicts are built unless a consumer iterates it. Columns
+        are converted to lists `block` lines at a time.
+        """
+        bounds = np.append(self.line_breaks(max_gap=max_gap, max_words=max_words), len(self)).tolist()
+        for i in range(0, len(bounds) - 1, block):
+            part = bounds[i:i + block + 1]
+            base = part[0]
+            texts, starts, ends = self[base:part[-1]].columns()
+            for a, b in zip(part[:-1], part[1:]):
+                yield {"start": starts[a - base], "end": ends[b - 1 - base],
+                       "words": WordRange(self, a, b, (texts[a - base:b - base], starts[a - base:b - base],
+                                                       ends[a - base:b - base]))}
+
+    def chunk_lines(self, max_gap=0.60, max_words=8):
+        return list(self.iter_lines(max_gap=max_gap, max_words=max_words))
+
+
+class WordTableBuilder:
+    """Appends words straight into growable column arrays, e.g. while a transcription streams in."""
+    __slots__ = ("start", "end", "offsets", "buffer", "prob")
+
+    def __init__(self):
+        self.start, self.end, self.prob = array("d"), array("d"), array("f")
+        self.offsets, self.buffer = array("q", [0]), bytearray()
+
+    def __len__(self):
+        return len(self.start)
+
+    def append(self, w):
+        self.start.append(float(w["start"]))
+        self.end.append(float(w["end"]))
+        self.buffer += w["text"].encode("utf-8")
+        self.offsets.append(len(self.buffer))
+        p = w.get("prob")
+        self.prob.append(float("nan") if p is None else p)
+
+    def table(self):
+        return WordTable(np.frombuffer(self.start, dtype=np.float64), np.frombuffer(self.end, dtype=np.float64),
+                         np.frombuffer(self.offsets, dtype=np.int64), self.buffer,
+                         np.frombuffer(self.prob, dtype=np.float32))
+
+
+class WordRange:
+    """Words a:b of a WordTable (one readable line) with their columns already as lists."""
+    __slots__ = ("table", "a", "b", "_columns")
+
+    def __init__(self, table, a, b, columns):
+        self.table, self.a, self.b, self._columns = table, a, b, columns
+
+    def columns(self):
+        return self._columns
+
+    def texts(self):
+        return self._columns[0]
+
+    def __len__(self):
+        return self.b - self.a
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.table[self.a + i]
+
+    def __iter__(self):
+        for i in range(self.a, self.b):
+            yield self.table[i]